@@ -40,10 +40,30 @@ import shutil
 import time
 import gc
 
+import dev_profiler
+import import_prewarm
+import precompute
+import report_context
+import report_fetcher
+import shared_cache
+import static_assets
+from report_tracer import ReportTracer, StreamlitWrapper, is_trace_requested, render_profile
+
 S3_BUCKET = "dataiesb-reports"
 DYNAMODB_TABLE = "dataiesb-reports"
 AWS_REGION = "us-east-1"
 
+REPORT_SKELETON_HTML = """
+<div class="report-skeleton">
+    <div class="skeleton-line skeleton-wide"></div>
+    <div class="skeleton-line"></div>
+    <div class="skeleton-block"></div>
+</div>
+"""
+
+# Start of the current script run, used for time-to-first-paint measurements
+_run_started = time.perf_counter()
+
 def render_dashboard_header(report_data):
     """Render the dashboard header with title and description"""
     titulo = report_data.get('titulo', 'Dashboard')
@@ -104,7 +124,13 @@ def render_dashboard_footer(report_data):
 
 def apply_custom_styles():
     """Apply only report header CSS - let TOML handle everything else"""
-    load_css_file(os.path.join(os.path.dirname(__file__), "style.css"))
+    try:
+        # Minified, fingerprinted stylesheet built once per process
+        st.markdown(static_assets.app_stylesheet_html(), unsafe_allow_html=True)
+    except Exception as e:
+        print(f"Error loading static assets: {e}")
+        load_css_file(os.path.join(os.path.dirname(__file__), "style.css"))
+        load_css_file(os.path.join(os.path.dirname(__file__), "navbar.css"))
 
 def check_local_main():
     """Check if there's a local main.py file for development"""
@@ -133,16 +159,6 @@ def load_and_execute_local_main():
             code = f.read()
         
         # Create execution context
-        class StreamlitWrapper:
-            def __init__(self, original_st):
-                self._st = original_st
-            
-            def __getattr__(self, name):
-                if name == 'set_page_config':
-                    # Return a no-op function for set_page_config
-                    return lambda *args, **kwargs: None
-                return getattr(self._st, name)
-        
         st_wrapper = StreamlitWrapper(st)
         
         exec_globals = {
@@ -234,6 +250,11 @@ def cleanup_old_temp_files():
 
 def load_reports_from_dynamodb():
     """Fetch reports from DynamoDB table"""
+    # Recent snapshot published by this or another replica
+    cached_reports = shared_cache.cache.get_catalog()
+    if cached_reports is not None:
+        return cached_reports
+    
     if not table:
         st.error("❌ Cliente DynamoDB não inicializado")
         return {}
@@ -261,7 +282,8 @@ def load_reports_from_dynamodb():
                     'deletado': item.get('deletado', False),
                     'user_email': item.get('user_email', ''),
                     'created_at': item.get('created_at', ''),
-                    'updated_at': item.get('updated_at', '')
+                    'updated_at': item.get('updated_at', ''),
+                    'artifact': item.get('artifact', '')
                 }
                 processed_count += 1
                 
@@ -269,6 +291,9 @@ def load_reports_from_dynamodb():
                 error_count += 1
                 continue
         
+        # Share the snapshot; reports whose updated_at changed are invalidated everywhere
+        shared_cache.cache.publish_catalog(reports_data)
+        
         # No success messages - silent loading
         return reports_data
         
@@ -280,13 +305,17 @@ def list_reports_in_dynamodb(reports_data):
     """List reports from the loaded DynamoDB data"""
     return [report_id for report_id in reports_data if not reports_data[report_id]["deletado"]]
 
-def load_and_execute_report(report_id, reports_data):
-    """Download and execute the main.py script from S3"""
+def load_and_execute_report(report_id, reports_data, prefetched=None):
+    """Download and execute the main.py script from S3
+
+    ``prefetched`` is the Future returned by ``report_fetcher.prefetch`` when the
+    download was already started in the background.
+    """
     if not s3_client:
         st.error("❌ Cliente S3 não inicializado")
         return
         
-    tmp_dir = None
+    tracer = None
     try:
         # Look up the report by its ID in the data
         report = reports_data.get(str(report_id))
@@ -294,91 +323,64 @@ def load_and_execute_report(report_id, reports_data):
             st.error(f"❌ Relatório não encontrado para o ID: {report_id}")
             return
         
-        # Render dashboard header
-        render_dashboard_header(report)
+        # Optional per-call tracing requested by the author with ?trace=<REPORT_TRACE_TOKEN>
+        tracer = ReportTracer(report_id, filename=f"<report {report_id}>") if is_trace_requested(st.query_params) else None
         
-        # Get the S3 path for the main.py script
-        s3_key = f"{report_id}/main.py"
+        # Render dashboard header and a placeholder while the code arrives
+        render_dashboard_header(report)
+        if tracer:
+            tracer.record_phase("time_to_first_paint", time.perf_counter() - _run_started)
+        skeleton = st.empty()
+        skeleton.markdown(REPORT_SKELETON_HTML, unsafe_allow_html=True)
         
-        # Check if the object exists in S3 before attempting to download
+        # Join the background download started in main(), or start it now
+        if prefetched is None:
+            prefetched = report_fetcher.prefetch(s3_client, S3_BUCKET, report_id, report.get("artifact"))
+        wait_start = time.perf_counter()
         try:
-            response = s3_client.head_object(Bucket=S3_BUCKET, Key=s3_key)
-        except s3_client.exceptions.NoSuchKey:
-            st.error(f"❌ Arquivo não encontrado no S3: {s3_key}")
+            artifact = prefetched.result()
+        except report_fetcher.ReportNotFound as not_found:
+            skeleton.empty()
+            st.error(f"❌ Arquivo não encontrado no S3: {not_found.key}")
             return
-        except Exception as head_error:
-            st.error(f"❌ Erro ao verificar arquivo no S3: {head_error}")
+        except Exception as fetch_error:
+            skeleton.empty()
+            st.error(f"❌ Erro ao baixar arquivo do S3: {fetch_error}")
             return
+        skeleton.empty()
+        code = artifact["code"]
+        if tracer:
+            tracer.record_phase("download", artifact["fetch_seconds"])
+            tracer.record_phase("download_wait", time.perf_counter() - wait_start)
+            tracer.record_phase("time_to_report", time.perf_counter() - _run_started)
         
-        # Create tmp directory if it doesn't exist
-        tmp_dir = os.path.join(os.getcwd(), "tmp")
-        os.makedirs(tmp_dir, exist_ok=True)
-        
-        # Create temporary file in tmp/ folder
-        tmp_file_path = os.path.join(tmp_dir, f"report_{report_id}_main.py")
-        
-        # Download file from S3
-        with open(tmp_file_path, "wb") as tmp_file:
-            s3_client.download_fileobj(S3_BUCKET, s3_key, tmp_file)
-
-        # Read the code
-        with open(tmp_file_path, "r", encoding="utf-8") as f:
-            code = f.read()
+        # Keep the catalog-wide import table used for prewarming up to date
+        import_prewarm.record_report_imports(report_id, code)
         
         # Create execution context with necessary imports and variables
-        class StreamlitWrapper:
-            def __init__(self, original_st):
-                self._st = original_st
-            
-            def __getattr__(self, name):
-                if name == 'set_page_config':
-                    # Return a no-op function for set_page_config
-                    return lambda *args, **kwargs: None
-                return getattr(self._st, name)
-        
-        st_wrapper = StreamlitWrapper(st)
-        
-        exec_globals = {
-            "__name__": "__main__",
-            "st": st_wrapper,
-            "pd": pd,
-            "boto3": boto3,
-            "s3_client": s3_client,
-            "S3_BUCKET": S3_BUCKET,
-            "AWS_REGION": AWS_REGION,
-            "s3fs": __import__('s3fs'),
-            "fs": get_s3fs(),
-            "os": os,
-            "tempfile": tempfile
-        }
+        bundle = artifact["bundle"]
+        exec_globals = report_context.build_exec_globals(
+            st, report_id, s3_client, get_s3fs(), S3_BUCKET, AWS_REGION, tracer=tracer, bundle=bundle
+        )
         
-        # Import additional modules that might be needed
-        try:
-            import plotly.express as px
-            import plotly.io as pio
-            exec_globals["px"] = px
-            exec_globals["pio"] = pio
-        except ImportError:
-            pass
-            
-        exec(code, exec_globals)
+        if tracer:
+            tracer.run(code, exec_globals)
+        elif bundle is not None:
+            exec(bundle.code(), exec_globals)
+        else:
+            exec(code, exec_globals)
         
         # Render dashboard footer
         render_dashboard_footer(report)
         
+        if tracer:
+            render_profile(st, tracer)
+        
     except Exception as e:
         st.error(f"❌ Erro ao carregar o relatório '{report_id}': {e}")
             
     finally:
-        # Clean up temporary files and free memory
-        if tmp_dir and os.path.exists(tmp_dir):
-            try:
-                for filename in os.listdir(tmp_dir):
-                    file_path = os.path.join(tmp_dir, filename)
-                    if os.path.isfile(file_path):
-                        os.remove(file_path)
-            except Exception:
-                pass
+        # Free memory
         try:
             del exec_globals
         except NameError:
@@ -481,13 +483,24 @@ with col2:
                 del st.session_state.dev_code_to_run
             st.rerun()
     
+    profile_run = st.checkbox(
+        "⏱️ Profile run",
+        key="dev_profile_enabled",
+        help="Measure wall time, time per function, memory peak and reruns"
+    )
+    
     # Preview section
     st.markdown("---")
     st.subheader("📊 Dashboard Preview")
     
     # Execute code if available
     if "dev_code_to_run" in st.session_state and st.session_state.dev_code_to_run:
+        profile_result = None
+        rerun_count = dev_profiler.count_rerun(st.session_state, st.session_state.dev_code_to_run)
         try:
+            # Compiled once per distinct source, reused across reruns
+            code = dev_profiler.get_compiled(st.session_state.dev_code_to_run)
+            
             with st.container():
                 # Execute the user code
                 exec_globals = {
@@ -509,12 +522,20 @@ with col2:
                     pass
                 
                 # Execute the user code
-                exec(st.session_state.dev_code_to_run, exec_globals)
+                if profile_run:
+                    profile_result = dev_profiler.run_profiled(code, exec_globals)
+                    if profile_result["error"] is not None:
+                        raise profile_result["error"]
+                else:
+                    exec(code, exec_globals)
             
             st.success("✅ Dashboard executed successfully!")
             
         except Exception as e:
             st.error(f"❌ Error executing dashboard: {str(e)}")
+        
+        if profile_result is not None:
+            dev_profiler.render_profile(st, profile_result, rerun_count)
     else:
         st.info("👆 Enter dashboard code above and click 'Run Dashboard' to see results")
         
@@ -530,6 +551,9 @@ with col2:
                 st.success("Button clicked!")
 
 def main():
+    global _run_started
+    _run_started = time.perf_counter()
+    
     # Set page config with MIV colors - this must be first
     st.set_page_config(
         page_title="Central de Relatórios", 
@@ -537,6 +561,19 @@ def main():
         initial_sidebar_state="expanded"
     )
     
+    # Determine if a report is selected or dev environment is requested
+    report_id = st.query_params.get("id")
+    dev_path = st.query_params.get("path")
+    
+    # Start downloading the report right away, overlapped with the page chrome,
+    # when the catalog snapshot says which artifact to fetch; otherwise the
+    # loader starts it once the catalog is loaded
+    prefetched = None
+    if report_id and dev_path != "dev":
+        artifact_type = report_fetcher.catalog_artifact_type(report_id)
+        if artifact_type:
+            prefetched = report_fetcher.prefetch(s3_client, S3_BUCKET, report_id, artifact_type)
+    
     # Apply minimal styling - TOML handles text visibility
     apply_custom_styles()
     
@@ -544,24 +581,10 @@ def main():
     cleanup_old_temp_files()
 
     # Top navbar matching dataiesb.com
-    st.markdown("""
-    <style>
-    .site-navbar { position: fixed; top: 0; left: 0; right: 0; z-index: 9999; background: #2e2e2e; border-bottom: 1px solid rgba(255,255,255,.08); height: 64px; display: flex; align-items: center; padding: 0 24px; }
-    .site-navbar .nav-container { display: flex; align-items: center; justify-content: space-between; width: 100%; max-width: 1200px; margin: 0 auto; }
-    .site-navbar a { font-size: .875rem; font-weight: 500; color: #999; text-decoration: none; transition: color .2s; }
-    .site-navbar a:hover { color: #E30613; }
-    .site-navbar .nav-links { display: flex; gap: 32px; align-items: center; }
-    .site-navbar .nav-cta { background: #E30613; color: #fff !important; padding: 10px 20px; border-radius: 6px; font-weight: 600; }
-    .site-navbar .nav-cta:hover { background: #ff4d5a; }
-    .site-navbar .nav-aurya { color: #ff4d5a !important; font-weight: 600; border: 1px solid rgba(227,6,19,.4); padding: 4px 12px; border-radius: 4px; font-size: .8rem; }
-    [data-testid="stAppViewContainer"] { margin-top: 64px; }
-    [data-testid="stSidebar"] { margin-top: 64px; z-index: 10000; }
-    [data-testid="collapsedControl"] { margin-top: 64px; z-index: 10000; }
-    [data-testid="stHeader"] { display: none; }
-    </style>
+    st.markdown(f"""
     <div class="site-navbar">
         <div class="nav-container">
-            <a href="https://dataiesb.com"><img src="https://d28lvm9jkyfotx.cloudfront.net/logo.png" alt="DataIESB" style="height:32px;"></a>
+            <a href="https://dataiesb.com"><img src="{static_assets.logo_url()}" alt="DataIESB" style="height:32px;"></a>
             <div class="nav-links">
                 <a href="https://aurya.dataiesb.com" target="_blank" class="nav-aurya">Assistente IA</a>
                 <a href="https://dataiesb.com/#projects">Painéis e Estudos</a>
@@ -576,15 +599,17 @@ def main():
     # Load reports from DynamoDB
     reports_data = load_reports_from_dynamodb()
 
-    # Determine if a report is selected or dev environment is requested
-    report_id = st.query_params.get("id")
-    dev_path = st.query_params.get("path")
+    # Import the most used heavy report modules in the background (once per process)
+    import_prewarm.start_prewarm(reports_data, s3_client, S3_BUCKET)
+    
+    # Run declared report precomputations in the background (once per process)
+    precompute.start_scheduler(s3_client, table, S3_BUCKET)
 
     if dev_path == "dev":
         # Show development environment
         show_dev_environment()
     elif report_id:
-        load_and_execute_report(report_id, reports_data)
+        load_and_execute_report(report_id, reports_data, prefetched)
     else:
         show_homepage(reports_data)
 
@@ -12,6 +12,9 @@ import shutil
 import tempfile
 import toml
 
+import static_assets
+from report_config import ReportConfig
+
 # AWS Configuration
 S3_BUCKET = "dataiesb-reports"
 DYNAMODB_TABLE = "dataiesb-reports"
@@ -45,6 +48,12 @@ def apply_report_toml_config(report_id):
         # Parse TOML
         config_data = toml.loads(config_content)
         
+        # Per-report custom CSS is published as a fingerprinted static file
+        custom_css = ReportConfig().get_report_metadata(config_data)['custom_css']
+        if custom_css:
+            css_file = static_assets.publish_css(custom_css, f"report-{report_id}")
+            st.markdown(static_assets.stylesheet_html(css_file), unsafe_allow_html=True)
+        
         # Apply only Streamlit configuration sections
         streamlit_config = {}
         for section in ['theme', 'server', 'browser', 'runner', 'logger', 'client']:
@@ -0,0 +1,228 @@
+"""
+Shared Dataset Store
+Materializes report DataFrames once per node as uncompressed Arrow IPC (Feather v2)
+files and hands report code memory-mapped views of them:
+- Every Streamlit process on the node maps the same file, so the OS page cache
+  holds one copy of the data instead of one per process
+- Datasets are versioned (S3 ETag / file mtime) and rebuilt when the source changes
+- A file lock makes sure only one process builds a given dataset
+
+Reports receive it as ``datasets``::
+
+    df = datasets.read_parquet("s3://dataiesb-reports/42/alunos.parquet")
+    table = datasets.get("alunos_por_uf", build_frame, version="2025-08", as_arrow=True)
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+STORE_DIR = os.environ.get(
+    "REPORT_DATASET_DIR",
+    os.path.join(tempfile.gettempdir(), "report-datasets")
+)
+
+
+def _slug(key: str) -> str:
+    """Readable, filesystem-safe and collision-free file stem for ``key``"""
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    readable = re.sub(r"[^A-Za-z0-9_.-]+", "_", key)[-48:].strip("_.")
+    return f"{readable}-{digest}" if readable else digest
+
+
+class _FileLock:
+    """Exclusive advisory lock shared by all processes on the node"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "a+")
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+
+
+class DatasetStore:
+    """Node-local store of memory-mapped Arrow datasets"""
+
+    def __init__(self, directory: str = STORE_DIR):
+        self.directory = directory
+        self._tables: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _paths(self, key: str):
+        stem = os.path.join(self.directory, _slug(key))
+        return f"{stem}.arrow", f"{stem}.json", f"{stem}.lock"
+
+    @staticmethod
+    def _read_meta(meta_path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @staticmethod
+    def _is_fresh(meta, data_path: str, version: Optional[str], ttl: Optional[float]) -> bool:
+        if meta is None or not os.path.exists(data_path):
+            return False
+        if version is not None and meta.get("version") != str(version):
+            return False
+        if ttl is not None and time.time() - meta.get("created_at", 0) > ttl:
+            return False
+        return True
+
+    def _map(self, key: str, data_path: str, meta):
+        """Memory-map the IPC file, reusing this process' mapping when unchanged"""
+        import pyarrow as pa
+
+        handle = (data_path, meta.get("version"), meta.get("created_at"))
+        with self._lock:
+            cached = self._tables.get(key)
+            if cached is not None and cached[0] == handle:
+                return cached[1]
+        with pa.memory_map(data_path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        with self._lock:
+            self._tables[key] = (handle, table)
+        return table
+
+    def _write(self, data_path: str, meta_path: str, key: str, value, version):
+        import pyarrow as pa
+
+        if not isinstance(value, pa.Table):
+            value = pa.Table.from_pandas(value, preserve_index=True)
+
+        tmp_path = f"{data_path}.{os.getpid()}.tmp"
+        # Uncompressed so readers can map the buffers without decoding them
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, value.schema) as writer:
+                writer.write_table(value)
+        os.replace(tmp_path, data_path)
+
+        meta = {
+            "key": key,
+            "version": None if version is None else str(version),
+            "created_at": time.time(),
+            "rows": value.num_rows,
+            "bytes": os.path.getsize(data_path),
+        }
+        tmp_meta = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, meta_path)
+        return meta
+
+    def get(self, key: str, loader: Callable[[], Any], version: Optional[str] = None,
+            ttl: Optional[float] = None, as_arrow: bool = False):
+        """Return dataset ``key``, building it with ``loader()`` when missing or stale
+
+        ``loader`` returns a DataFrame or ``pyarrow.Table``. With ``as_arrow`` the
+        memory-mapped Table is returned as is; otherwise it is converted to a
+        DataFrame of Arrow-backed columns (``pd.ArrowDtype``), so strings and
+        nullable columns stay views of the mapped file too. Treat the result as
+        read-only.
+        """
+        data_path, meta_path, lock_path = self._paths(key)
+        meta = self._read_meta(meta_path)
+
+        if not self._is_fresh(meta, data_path, version, ttl):
+            os.makedirs(self.directory, exist_ok=True)
+            with _FileLock(lock_path):
+                # Another process may have built it while we waited for the lock
+                meta = self._read_meta(meta_path)
+                if not self._is_fresh(meta, data_path, version, ttl):
+                    meta = self._write(data_path, meta_path, key, loader(), version)
+
+        table = self._map(key, data_path, meta)
+        if as_arrow:
+            return table
+        import pandas as pd
+
+        # NumPy dtypes would copy every string/object column into this process
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+    def _source_version(self, path: str, fs=None) -> str:
+        """ETag for S3 objects, mtime and size for local files"""
+        if path.startswith("s3://"):
+            fs = fs or self._s3fs()
+            info = fs.info(path)
+            return str(info.get("ETag") or info.get("LastModified") or info.get("size"))
+        stat = os.stat(path)
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    @staticmethod
+    def _s3fs():
+        import s3fs
+        return s3fs.S3FileSystem()
+
+    def read_csv(self, path: str, fs=None, as_arrow: bool = False, **kwargs):
+        """``pd.read_csv`` materialized once per node and source version"""
+        import pandas as pd
+
+        def load():
+            if path.startswith("s3://"):
+                with (fs or self._s3fs()).open(path, "rb") as f:
+                    return pd.read_csv(f, **kwargs)
+            return pd.read_csv(path, **kwargs)
+
+        key = f"csv:{path}:{json.dumps(kwargs, sort_keys=True, default=str)}"
+        return self.get(key, load, version=self._source_version(path, fs), as_arrow=as_arrow)
+
+    def read_parquet(self, path: str, fs=None, as_arrow: bool = False, **kwargs):
+        """``pd.read_parquet`` materialized once per node and source version"""
+        import pandas as pd
+
+        def load():
+            if path.startswith("s3://"):
+                with (fs or self._s3fs()).open(path, "rb") as f:
+                    return pd.read_parquet(f, **kwargs)
+            return pd.read_parquet(path, **kwargs)
+
+        key = f"parquet:{path}:{json.dumps(kwargs, sort_keys=True, default=str)}"
+        return self.get(key, load, version=self._source_version(path, fs), as_arrow=as_arrow)
+
+    def evict(self, key: str):
+        """Remove one dataset from the node"""
+        data_path, meta_path, lock_path = self._paths(key)
+        with self._lock:
+            self._tables.pop(key, None)
+        with _FileLock(lock_path):
+            for path in (data_path, meta_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        """Datasets currently materialized on the node"""
+        rows = []
+        if not os.path.isdir(self.directory):
+            return rows
+        for filename in sorted(os.listdir(self.directory)):
+            if filename.endswith(".json"):
+                meta = self._read_meta(os.path.join(self.directory, filename))
+                if meta:
+                    rows.append(meta)
+        return rows
+
+
+# Shared instance injected into report code as ``datasets``
+store = DatasetStore()
@@ -0,0 +1,243 @@
+"""
+Database Connection Pools
+Process-wide SQLAlchemy engines (PostgreSQL, Trino, ...) shared by all reports,
+plus a query-result cache:
+- Named connections configured by ``REPORT_DB_<NAME>_URL`` environment variables
+- One pooled engine per name, reused across reruns and sessions
+- Results cached by connection, normalized SQL and parameters, with TTL,
+  a byte budget (LRU eviction) and explicit invalidation
+- Identical queries running concurrently are executed only once
+
+Reports receive it as ``db``::
+
+    df = db.query("trino", "SELECT uf, count(*) AS n FROM alunos GROUP BY uf", ttl=600)
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+URL_ENV_PREFIX = "REPORT_DB_"
+URL_ENV_SUFFIX = "_URL"
+DEFAULT_TTL = int(os.environ.get("REPORT_DB_CACHE_TTL", "300"))
+CACHE_BUDGET_BYTES = int(os.environ.get("REPORT_DB_CACHE_MB", "128")) * 1024 * 1024
+
+DEFAULT_ENGINE_OPTIONS = {
+    "pool_size": int(os.environ.get("REPORT_DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.environ.get("REPORT_DB_MAX_OVERFLOW", "5")),
+    "pool_pre_ping": True,
+    "pool_recycle": 1800,
+}
+
+_STRING_LITERAL = re.compile(r"('(?:[^']|'')*')")
+_LINE_COMMENT = re.compile(r"--[^\n]*")
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and comments outside string literals"""
+    parts = _STRING_LITERAL.split(sql)
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r"\s+", " ", _LINE_COMMENT.sub(" ", parts[i]))
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def cache_key(name: str, sql: str, params: Optional[Dict[str, Any]] = None, url: str = "") -> str:
+    """Key of a query result: connection name and URL, normalized SQL and parameters"""
+    payload = json.dumps([name, url, normalize_sql(sql), params or {}], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _frame_bytes(df) -> int:
+    try:
+        return int(df.memory_usage(index=True, deep=True).sum())
+    except Exception:
+        return 0
+
+
+class QueryResultCache:
+    """LRU cache of query results bounded by TTL and total bytes"""
+
+    def __init__(self, budget_bytes: int = CACHE_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["expires_at"] < time.time():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["value"]
+
+    def put(self, key: str, value, ttl: float, name: str, sql: str, params):
+        size = _frame_bytes(value)
+        if size > self.budget_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = {
+                "value": value,
+                "bytes": size,
+                "expires_at": time.time() + ttl,
+                "name": name,
+                "sql": normalize_sql(sql),
+                "params": params or {},
+            }
+            self._bytes += size
+            while self._bytes > self.budget_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, name: Optional[str] = None, sql: Optional[str] = None,
+                   params: Optional[Dict[str, Any]] = None) -> int:
+        """Drop entries matching the connection name, SQL and/or parameters"""
+        normalized = normalize_sql(sql) if sql is not None else None
+        with self._lock:
+            keys = [
+                key for key, entry in self._entries.items()
+                if (name is None or entry["name"] == name)
+                and (normalized is None or entry["sql"] == normalized)
+                and (params is None or entry["params"] == params)
+            ]
+            for key in keys:
+                self._drop(key)
+        return len(keys)
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry["bytes"]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes,
+                    "budget_bytes": self.budget_bytes, "hits": self.hits, "misses": self.misses}
+
+
+class ConnectionRegistry:
+    """Named, pooled SQLAlchemy engines shared by every report in the process"""
+
+    def __init__(self):
+        self._urls: Dict[str, str] = {}
+        self._options: Dict[str, Dict[str, Any]] = {}
+        self._engines: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, threading.Lock] = {}
+        self.cache = QueryResultCache()
+
+    def register(self, name: str, url: str, **engine_options):
+        """Declare a named connection (overrides the environment)"""
+        with self._lock:
+            self._urls[name] = url
+            self._options[name] = engine_options
+            engine = self._engines.pop(name, None)
+        if engine is not None:
+            engine.dispose()
+        # Results cached under this name may come from another database
+        self.cache.invalidate(name)
+
+    def names(self):
+        """Connections available from registration or the environment"""
+        env_names = [
+            key[len(URL_ENV_PREFIX):-len(URL_ENV_SUFFIX)].lower()
+            for key in os.environ
+            if key.startswith(URL_ENV_PREFIX) and key.endswith(URL_ENV_SUFFIX)
+        ]
+        return sorted(set(self._urls) | set(env_names))
+
+    def _url_for(self, name: str) -> str:
+        url = self._urls.get(name) or os.environ.get(f"{URL_ENV_PREFIX}{name.upper()}{URL_ENV_SUFFIX}")
+        if not url:
+            raise KeyError(f"Conexão '{name}' não configurada "
+                           f"(defina {URL_ENV_PREFIX}{name.upper()}{URL_ENV_SUFFIX})")
+        return url
+
+    def engine(self, name: str):
+        """Pooled engine for ``name``, created on first use"""
+        with self._lock:
+            engine = self._engines.get(name)
+            if engine is not None:
+                return engine
+            from sqlalchemy import create_engine
+
+            options = dict(DEFAULT_ENGINE_OPTIONS)
+            options.update(self._options.get(name, {}))
+            engine = create_engine(self._url_for(name), **options)
+            self._engines[name] = engine
+            return engine
+
+    def connect(self, name: str):
+        """Connection checked out from the pool (use as a context manager)"""
+        return self.engine(name).connect()
+
+    def query(self, name: str, sql: str, params: Optional[Dict[str, Any]] = None,
+              ttl: Optional[float] = DEFAULT_TTL):
+        """Run ``sql`` and return a DataFrame, served from the cache when fresh
+
+        ``ttl=0`` bypasses the cache. Treat the returned frame as read-only.
+        """
+        import pandas as pd
+        from sqlalchemy import text
+
+        if not ttl:
+            with self.connect(name) as conn:
+                return pd.read_sql(text(sql), conn, params=params)
+
+        key = cache_key(name, sql, params, self._url_for(name))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached.copy(deep=False)
+
+        with self._lock:
+            inflight = self._inflight.setdefault(key, threading.Lock())
+        # Only one session runs a given query; the others wait for its result
+        try:
+            with inflight:
+                cached = self.cache.get(key)
+                if cached is None:
+                    with self.connect(name) as conn:
+                        cached = pd.read_sql(text(sql), conn, params=params)
+                    self.cache.put(key, cached, ttl, name, sql, params)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        return cached.copy(deep=False)
+
+    def invalidate(self, name: Optional[str] = None, sql: Optional[str] = None,
+                   params: Optional[Dict[str, Any]] = None) -> int:
+        """Drop cached results; with no arguments the whole cache is cleared"""
+        return self.cache.invalidate(name, sql, params)
+
+    def stats(self) -> Dict[str, Any]:
+        pools = {}
+        with self._lock:
+            for name, engine in self._engines.items():
+                try:
+                    pools[name] = engine.pool.status()
+                except Exception:
+                    pools[name] = "unknown"
+        return {"pools": pools, "cache": self.cache.stats()}
+
+    def dispose(self):
+        """Close every pooled connection"""
+        with self._lock:
+            engines = list(self._engines.values())
+            self._engines.clear()
+        for engine in engines:
+            engine.dispose()
+
+
+# Shared instance injected into report code as ``db``
+registry = ConnectionRegistry()
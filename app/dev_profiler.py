@@ -0,0 +1,129 @@
+"""
+Development Environment Profiler
+Helpers for the ``?path=dev`` environment:
+- Keeps dashboard code compiled across reruns until the source changes
+- Profiles a run: wall time, cProfile breakdown by function, memory peak
+- Counts how many reruns the same code has triggered in the session
+"""
+
+import cProfile
+import hashlib
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+DEV_FILENAME = "<dev dashboard>"
+COMPILE_CACHE_SIZE = 32
+TOP_FUNCTIONS = 25
+
+_compile_cache: "OrderedDict[str, Any]" = OrderedDict()
+_compile_lock = threading.Lock()
+# tracemalloc and the profiler hooks are process-wide, so profiled runs take turns
+_profile_lock = threading.Lock()
+
+
+def source_hash(source: str) -> str:
+    """Stable identifier for a piece of dashboard code"""
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def get_compiled(source: str):
+    """Return the code object for ``source``, compiling only when it changed"""
+    key = source_hash(source)
+    with _compile_lock:
+        code = _compile_cache.get(key)
+        if code is not None:
+            _compile_cache.move_to_end(key)
+            return code
+
+    code = compile(source, DEV_FILENAME, "exec")
+    with _compile_lock:
+        _compile_cache[key] = code
+        while len(_compile_cache) > COMPILE_CACHE_SIZE:
+            _compile_cache.popitem(last=False)
+    return code
+
+
+def count_rerun(session_state, source: str) -> int:
+    """Increment and return the number of runs of ``source`` in this session"""
+    key = source_hash(source)
+    if session_state.get("dev_profile_code_hash") != key:
+        session_state["dev_profile_code_hash"] = key
+        session_state["dev_profile_run_count"] = 0
+    session_state["dev_profile_run_count"] = session_state.get("dev_profile_run_count", 0) + 1
+    return session_state["dev_profile_run_count"]
+
+
+def _function_rows(profiler: cProfile.Profile) -> List[Dict[str, Any]]:
+    """Flatten cProfile stats into rows sorted by cumulative time"""
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, lineno, funcname), (cc, nc, tt, ct, _callers) in stats.stats.items():
+        rows.append({
+            "function": funcname,
+            "location": f"{filename}:{lineno}",
+            "calls": nc,
+            "primitive_calls": cc,
+            "tottime": round(tt, 6),
+            "cumtime": round(ct, 6),
+        })
+    rows.sort(key=lambda r: r["cumtime"], reverse=True)
+    return rows[:TOP_FUNCTIONS]
+
+
+def run_profiled(code, exec_globals: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute compiled dashboard code under cProfile and tracemalloc
+
+    Runs are serialized across sessions; the memory peak still includes
+    allocations made meanwhile by other (unprofiled) sessions' threads.
+    """
+    with _profile_lock:
+        return _run_profiled(code, exec_globals)
+
+
+def _run_profiled(code, exec_globals: Dict[str, Any]) -> Dict[str, Any]:
+    profiler = cProfile.Profile()
+    started_tracemalloc = not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start()
+    else:
+        tracemalloc.reset_peak()
+
+    result: Dict[str, Any] = {"error": None}
+    start = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            exec(code, exec_globals)
+        finally:
+            profiler.disable()
+    except Exception as e:
+        result["error"] = e
+    finally:
+        result["wall_seconds"] = time.perf_counter() - start
+        _current, peak = tracemalloc.get_traced_memory()
+        if started_tracemalloc:
+            tracemalloc.stop()
+        result["peak_memory_bytes"] = peak
+        result["functions"] = _function_rows(profiler)
+    return result
+
+
+def render_profile(st, result: Dict[str, Any], rerun_count: int):
+    """Render the profiling results of a dev run"""
+    st.markdown("---")
+    st.subheader("⏱️ Profile")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Wall time", f"{result['wall_seconds']:.3f}s")
+    with col2:
+        st.metric("Memory peak", f"{result['peak_memory_bytes'] / (1024 * 1024):.1f} MB")
+    with col3:
+        st.metric("Reruns", rerun_count)
+
+    st.markdown("**Functions by cumulative time**")
+    st.dataframe(result["functions"], use_container_width=True)
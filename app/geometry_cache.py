@@ -0,0 +1,234 @@
+"""
+Geometry Cache
+Shared, process-wide geometry service for geopandas/folium reports:
+- Loads a shapefile/GeoJSON layer once per process (local path or s3://)
+- Precomputes simplified versions at several tolerance levels
+- Keeps a spatial index to clip layers to the visible bounding box
+- Returns the coarsest geometry that still looks right at the current zoom
+- Bounded by ``REPORT_GEO_MAX_BYTES``; least recently used layers are dropped
+
+Reports receive it as ``geo``::
+
+    layer = geo.load("s3://dataiesb-reports/42/municipios.geojson")
+    gdf = layer.get(zoom=map_state.get("zoom"), bbox=map_state.get("bounds"))
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Zoom levels (web map tiles) at which simplified copies are precomputed
+DEFAULT_ZOOM_LEVELS = (4, 6, 8, 10, 12)
+DEFAULT_WIDTH_PX = 1024
+TILE_SIZE_PX = 256
+WEB_CRS = "EPSG:4326"
+MAX_BYTES = int(os.environ.get("REPORT_GEO_MAX_BYTES", str(256 * 1024 * 1024)))
+COORDINATE_BYTES = 16
+
+
+def degrees_per_pixel(zoom: float) -> float:
+    """Ground resolution of a web map at ``zoom``, in degrees per pixel"""
+    return 360.0 / (TILE_SIZE_PX * (2 ** zoom))
+
+
+def _normalize_bbox(bbox) -> Optional[Tuple[float, float, float, float]]:
+    """Accept (minx, miny, maxx, maxy) or folium's [[south, west], [north, east]]"""
+    if bbox is None:
+        return None
+    if isinstance(bbox, dict):
+        # streamlit-folium: {"_southWest": {"lat", "lng"}, "_northEast": {...}}
+        sw, ne = bbox.get("_southWest") or {}, bbox.get("_northEast") or {}
+        if sw.get("lng") is None or ne.get("lng") is None:
+            return None
+        return (sw["lng"], sw["lat"], ne["lng"], ne["lat"])
+    if len(bbox) == 2:
+        (south, west), (north, east) = bbox
+        return (west, south, east, north)
+    return tuple(bbox)
+
+
+class GeometryLayer:
+    """A loaded layer with precomputed simplification levels and a spatial index"""
+
+    def __init__(self, name: str, gdf, zoom_levels: Sequence[int] = DEFAULT_ZOOM_LEVELS):
+        import geopandas as gpd
+        import shapely
+
+        if gdf.crs is not None and str(gdf.crs) != WEB_CRS:
+            gdf = gdf.to_crs(WEB_CRS)
+
+        self.name = name
+        self.full = gdf
+        self.loaded_at = time.time()
+        self.sindex = gdf.sindex
+        # (tolerance, GeoSeries), finest first; same row order as ``full``.
+        # Only geometries are kept per level, attributes are shared with ``full``
+        self.levels: List[Tuple[float, Any]] = [(0.0, gdf.geometry)]
+
+        for zoom in sorted(zoom_levels, reverse=True):
+            tolerance = degrees_per_pixel(zoom)
+            geometry = gdf.geometry.simplify(tolerance, preserve_topology=True)
+            try:
+                # Snap to the pixel grid so coordinates serialize with fewer digits
+                geometry = gpd.GeoSeries(
+                    shapely.set_precision(geometry.to_numpy(), grid_size=tolerance / 2),
+                    index=gdf.index, crs=gdf.crs,
+                )
+            except Exception:
+                pass
+            self.levels.append((tolerance, geometry))
+
+        coordinates = sum(int(shapely.get_num_coordinates(g.values).sum()) for _, g in self.levels)
+        attributes = gdf.drop(columns=gdf.geometry.name).memory_usage(index=True, deep=True).sum()
+        self.nbytes = int(attributes) + coordinates * COORDINATE_BYTES
+
+    def tolerance_for(self, zoom: Optional[float] = None, bbox=None,
+                      width_px: int = DEFAULT_WIDTH_PX) -> float:
+        """Largest tolerance that is invisible at the requested view"""
+        candidates = []
+        if zoom is not None:
+            candidates.append(degrees_per_pixel(zoom))
+        bbox = _normalize_bbox(bbox)
+        if bbox is not None and width_px:
+            candidates.append(abs(bbox[2] - bbox[0]) / width_px)
+        return min(candidates) if candidates else 0.0
+
+    def get(self, zoom: Optional[float] = None, bbox=None,
+            width_px: int = DEFAULT_WIDTH_PX, columns: Optional[List[str]] = None):
+        """Return the coarsest geometry that fits the current zoom or bounding box
+
+        The result is a shallow copy of the per-process layer: adding or
+        replacing columns is private to the caller, but existing values must be
+        treated as read-only.
+        """
+        pixel = self.tolerance_for(zoom, bbox, width_px)
+        tolerance, geometry = self.levels[0]
+        for level_tolerance, level_geometry in self.levels:
+            if level_tolerance <= pixel and level_tolerance >= tolerance:
+                tolerance, geometry = level_tolerance, level_geometry
+
+        gdf = self.full
+        bbox = _normalize_bbox(bbox)
+        if bbox is not None:
+            positions = sorted(self.sindex.query(self._box(bbox), predicate="intersects"))
+            gdf, geometry = gdf.iloc[positions], geometry.iloc[positions]
+
+        if columns is not None:
+            gdf = gdf[list(columns) + [gdf.geometry.name]]
+        # Shallow copy: the attribute columns stay shared with every session
+        gdf = gdf.copy(deep=False)
+        if tolerance > 0:
+            gdf[gdf.geometry.name] = geometry
+        return gdf
+
+    def geojson(self, **kwargs) -> str:
+        """GeoJSON of :meth:`get`, ready for ``folium.GeoJson``/``Choropleth``"""
+        return self.get(**kwargs).to_json()
+
+    @staticmethod
+    def _box(bbox):
+        from shapely.geometry import box
+        return box(*bbox)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Coordinate counts per simplification level"""
+        import shapely
+
+        rows = []
+        for tolerance, geometry in self.levels:
+            rows.append({
+                "tolerance": tolerance,
+                "features": len(geometry),
+                "coordinates": int(shapely.get_num_coordinates(geometry.values).sum()),
+            })
+        return rows
+
+
+class GeometryService:
+    """Process-wide registry of geometry layers shared by all reports"""
+
+    def __init__(self, max_bytes: int = MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._layers: "OrderedDict[str, GeometryLayer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+
+    def _lookup(self, name: str) -> Optional[GeometryLayer]:
+        # Caller holds the lock
+        layer = self._layers.get(name)
+        if layer is not None:
+            self._layers.move_to_end(name)
+        return layer
+
+    def _store(self, name: str, layer: GeometryLayer):
+        """Add ``layer`` and drop least recently used layers over the byte budget"""
+        with self._lock:
+            self._layers[name] = layer
+            self._layers.move_to_end(name)
+            total = sum(l.nbytes for l in self._layers.values())
+            while total > self.max_bytes and len(self._layers) > 1:
+                _, evicted = self._layers.popitem(last=False)
+                total -= evicted.nbytes
+
+    def load(self, path: str, name: Optional[str] = None,
+             zoom_levels: Sequence[int] = DEFAULT_ZOOM_LEVELS, refresh: bool = False,
+             **read_kwargs) -> GeometryLayer:
+        """Load ``path`` once per process and return its cached layer"""
+        name = name or path
+        with self._lock:
+            layer = self._lookup(name)
+            if layer is not None and not refresh:
+                return layer
+            load_lock = self._loading.setdefault(name, threading.Lock())
+
+        # One loader per layer; concurrent sessions wait for it instead of re-reading
+        with load_lock:
+            with self._lock:
+                layer = self._lookup(name)
+            if layer is not None and not refresh:
+                return layer
+            layer = GeometryLayer(name, self._read(path, **read_kwargs), zoom_levels)
+            self._store(name, layer)
+            return layer
+
+    def register(self, name: str, gdf, zoom_levels: Sequence[int] = DEFAULT_ZOOM_LEVELS) -> GeometryLayer:
+        """Register a GeoDataFrame built by report code"""
+        layer = GeometryLayer(name, gdf, zoom_levels)
+        self._store(name, layer)
+        return layer
+
+    def get(self, name: str, **kwargs):
+        """Shortcut for ``load(name).get(**kwargs)`` on an already loaded layer"""
+        with self._lock:
+            layer = self._lookup(name)
+        if layer is None:
+            layer = self.load(name)
+        return layer.get(**kwargs)
+
+    def invalidate(self, name: Optional[str] = None):
+        """Drop one layer, or all of them"""
+        with self._lock:
+            if name is None:
+                self._layers.clear()
+            else:
+                self._layers.pop(name, None)
+
+    def layers(self) -> List[str]:
+        with self._lock:
+            return list(self._layers)
+
+    @staticmethod
+    def _read(path: str, **read_kwargs):
+        import geopandas as gpd
+
+        if path.startswith("s3://"):
+            import fsspec
+            with fsspec.open(path, "rb") as f:
+                return gpd.read_file(f, **read_kwargs)
+        return gpd.read_file(path, **read_kwargs)
+
+
+# Shared instance injected into report code as ``geo``
+service = GeometryService()
@@ -0,0 +1,160 @@
+"""
+Import Prewarming
+Keeps a catalog-wide table of the modules imported by reports and imports the
+most used heavy ones on a background thread after startup, so the first viewer
+of a geopandas/sklearn/matplotlib report doesn't pay a multi-second import.
+"""
+
+import ast
+import importlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List, Set
+
+STATS_PATH = os.environ.get(
+    "REPORT_IMPORT_STATS",
+    os.path.join(tempfile.gettempdir(), "report-app", "import_stats.json")
+)
+PREWARM_TOP_N = int(os.environ.get("REPORT_PREWARM_TOP_N", "8"))
+
+# Only well-known heavy libraries are prewarmed; arbitrary report modules are
+# never imported outside the report itself.
+HEAVY_MODULES = {
+    "geopandas", "shapely", "folium", "streamlit_folium", "sklearn", "seaborn",
+    "matplotlib", "statsmodels", "scipy", "altair", "plotly", "pydeck",
+    "sqlalchemy", "trino", "psycopg2", "pyarrow", "numpy",
+}
+
+_lock = threading.Lock()
+_report_imports: Dict[str, List[str]] = {}
+_loaded = False
+_started = False
+_status = {"state": "idle", "imported": [], "failed": [], "seconds": 0.0}
+
+
+def parse_imports(code: str) -> Set[str]:
+    """Return the dotted module names imported anywhere in a report"""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return set()
+
+    modules = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.add(node.module)
+    return modules
+
+
+def _load_stats():
+    """Load the persisted table once per process"""
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    try:
+        with open(STATS_PATH, "r", encoding="utf-8") as f:
+            _report_imports.update(json.load(f).get("reports", {}))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Error loading import stats: {e}")
+
+
+def _save_stats():
+    try:
+        os.makedirs(os.path.dirname(STATS_PATH), exist_ok=True)
+        tmp_path = f"{STATS_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"reports": _report_imports}, f)
+        os.replace(tmp_path, STATS_PATH)
+    except Exception as e:
+        print(f"Error saving import stats: {e}")
+
+
+def record_report_imports(report_id, code: str):
+    """Update the catalog-wide table with the imports of one report"""
+    modules = sorted(parse_imports(code))
+    with _lock:
+        _load_stats()
+        if _report_imports.get(str(report_id)) == modules:
+            return
+        _report_imports[str(report_id)] = modules
+        _save_stats()
+
+
+def import_frequencies() -> Dict[str, int]:
+    """Number of reports importing each module"""
+    with _lock:
+        _load_stats()
+        counts: Dict[str, int] = {}
+        for modules in _report_imports.values():
+            for module in modules:
+                counts[module] = counts.get(module, 0) + 1
+    return counts
+
+
+def modules_to_prewarm(top_n: int = PREWARM_TOP_N) -> List[str]:
+    """Most used heavy modules, most frequent first"""
+    counts = import_frequencies()
+    heavy = [m for m in counts if m.split(".")[0] in HEAVY_MODULES]
+    heavy.sort(key=lambda m: (-counts[m], m))
+    return heavy[:top_n]
+
+
+def _scan_catalog(reports_data, s3_client, bucket: str):
+    """Build the table from the published reports when none was persisted"""
+    for report_id, report in reports_data.items():
+        if report.get("deletado"):
+            continue
+        try:
+            response = s3_client.get_object(Bucket=bucket, Key=f"{report_id}/main.py")
+            record_report_imports(report_id, response["Body"].read().decode("utf-8"))
+        except Exception:
+            continue
+
+
+def _prewarm(reports_data, s3_client, bucket: str):
+    start = time.perf_counter()
+    _status["state"] = "running"
+    with _lock:
+        _load_stats()
+        empty = not _report_imports
+    if empty and s3_client is not None and reports_data:
+        _scan_catalog(reports_data, s3_client, bucket)
+
+    for module in modules_to_prewarm():
+        try:
+            importlib.import_module(module)
+            _status["imported"].append(module)
+        except Exception:
+            _status["failed"].append(module)
+    _status["seconds"] = time.perf_counter() - start
+    _status["state"] = "done"
+
+
+def start_prewarm(reports_data=None, s3_client=None, bucket: str = ""):
+    """Start the background prewarm thread once per process"""
+    global _started
+    with _lock:
+        if _started:
+            return False
+        _started = True
+    thread = threading.Thread(
+        target=_prewarm,
+        args=(dict(reports_data or {}), s3_client, bucket),
+        name="import-prewarm",
+        daemon=True,
+    )
+    thread.start()
+    return True
+
+
+def prewarm_status() -> Dict:
+    """Snapshot of the prewarm progress"""
+    return dict(_status)
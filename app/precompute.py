@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Scheduled Precomputation
+Runs the heavy aggregates a report declares in its ``config.toml`` ahead of time
+and stores them as compact Parquet, so interactive views read kilobytes:
+
+    [[precompute]]
+    name = "alunos_por_uf"
+    function = "aggregates:alunos_por_uf"   # module:function shipped with the report
+    sources = { alunos = "s3://dataiesb-reports/42/alunos.parquet" }
+    params = [{ ano = 2023 }, { ano = 2024 }]
+    schedule = "0 */6 * * *"                # cron (UTC) or @hourly/@daily/@weekly
+    on_change = true                        # also rerun when a source ETag changes
+
+The function receives the loaded sources and one parameter set:
+``alunos_por_uf(sources, ano) -> DataFrame``. Results are written to
+``<report_id>/precomputed/<name>/<params>.parquet`` and read back by report
+code with ``precomputed("alunos_por_uf", ano=2024)``.
+
+``python app/precompute.py run`` runs the due jobs; in production it is a k8s
+CronJob (``k8s/deployment.yaml``), outside the serving pods. An in-app
+background scheduler (``REPORT_PRECOMPUTE_SCHEDULER=1``, off by default) does
+the same every ``REPORT_PRECOMPUTE_INTERVAL`` seconds for development. A job
+that fails is retried with exponential backoff recorded in its ``_state.json``.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import report_bundle
+import report_fetcher
+import shared_cache
+from report_config import ReportConfig
+
+S3_BUCKET = "dataiesb-reports"
+SCHEDULER_ENABLED = os.environ.get("REPORT_PRECOMPUTE_SCHEDULER", "0") == "1"
+SCHEDULER_INTERVAL = int(os.environ.get("REPORT_PRECOMPUTE_INTERVAL", "60"))
+READER_TTL = 60
+READER_CACHE_SIZE = int(os.environ.get("REPORT_PRECOMPUTED_CACHE_SIZE", "64"))
+LEASE_SECONDS = 1800
+BACKOFF_SECONDS = 300
+MAX_BACKOFF_SECONDS = 6 * 3600
+# Entry of ``_state.json`` holding the last failure (parameter keys never look like it)
+FAILURE_KEY = "__failure__"
+
+CRON_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+
+
+class CronSchedule:
+    """Five-field cron expression (minute hour day month weekday), UTC"""
+
+    RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+
+    def __init__(self, expression: str):
+        self.expression = CRON_ALIASES.get(expression.strip(), expression.strip())
+        fields = self.expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Expressão cron inválida: {expression}")
+        self.minutes, self.hours, self.days, self.months, self.weekdays = [
+            self._parse(field, low, high) for field, (low, high) in zip(fields, self.RANGES)
+        ]
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> set:
+        values = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step_text = part.split("/", 1)
+                step = int(step_text)
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start, end = (int(v) for v in part.split("-", 1))
+            else:
+                start = end = int(part)
+            values.update(range(start, end + 1, step))
+        if high == 6 and 7 in values:
+            values.add(0)  # 7 is also Sunday
+        return {v for v in values if low <= v <= high}
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        # Both restricted: standard cron matches either
+        return day_ok or weekday_ok
+
+    def next_after(self, moment: datetime) -> datetime:
+        """First fire time strictly after ``moment``"""
+        moment = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+                continue
+            if not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+                continue
+            if moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+                continue
+            return moment
+        raise ValueError(f"Expressão cron nunca dispara: {self.expression}")
+
+    def is_due(self, last_run: Optional[float], now: Optional[float] = None) -> bool:
+        if last_run is None:
+            return True
+        now = now if now is not None else time.time()
+        last = datetime.fromtimestamp(last_run, tz=timezone.utc)
+        return self.next_after(last).timestamp() <= now
+
+
+def params_key(params: Dict[str, Any]) -> str:
+    """File stem identifying one parameter set"""
+    if not params:
+        return "default"
+    readable = "__".join(f"{k}={params[k]}" for k in sorted(params))
+    readable = re.sub(r"[^A-Za-z0-9=_.-]+", "_", readable)[:80]
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:8]
+    return f"{readable}-{digest}"
+
+
+def result_key(report_id, name: str, params: Dict[str, Any]) -> str:
+    return f"{report_id}/precomputed/{name}/{params_key(params)}.parquet"
+
+
+def state_key(report_id, name: str) -> str:
+    return f"{report_id}/precomputed/{name}/_state.json"
+
+
+def _split_s3(path: str):
+    bucket, _, key = path[len("s3://"):].partition("/")
+    return bucket, key
+
+
+class Precomputer:
+    """Loads report declarations and runs the jobs that are due"""
+
+    def __init__(self, s3_client, bucket: str = S3_BUCKET):
+        self.s3_client = s3_client
+        self.bucket = bucket
+
+    # Report artifacts -------------------------------------------------------
+
+    def _get(self, key: str, bucket: Optional[str] = None) -> Optional[bytes]:
+        try:
+            response = self.s3_client.get_object(Bucket=bucket or self.bucket, Key=key)
+        except Exception as e:
+            if report_fetcher.is_missing(self.s3_client, e):
+                return None
+            raise
+        return response["Body"].read()
+
+    def _load_report(self, report_id):
+        """(config, bundle) of a report; bundle is None for single-file reports"""
+        data = self._get(report_bundle.bundle_key(report_id))
+        if data is not None:
+            bundle = report_bundle.load_bundle(data)
+            return bundle.config, bundle
+        config = self._get(f"{report_id}/config.toml")
+        if config is None:
+            return {}, None
+        return ReportConfig().load_report_config(config.decode("utf-8")), None
+
+    def declarations(self, report_id) -> List[Dict[str, Any]]:
+        config, _ = self._load_report(report_id)
+        return ReportConfig().get_precomputations(config)
+
+    def _resolve_function(self, report_id, spec: str, bundle):
+        module_name, _, function_name = spec.partition(":")
+        module_path = module_name.replace(".", "/") + ".py"
+        if bundle is not None:
+            # Lazy imports inside the function keep resolving through the bundle
+            return getattr(bundle.import_module(module_name), function_name)
+        source = self._get(f"{report_id}/{module_path}")
+        if source is None:
+            raise FileNotFoundError(f"Módulo não encontrado: {report_id}/{module_path}")
+        namespace = {"__name__": module_name}
+        exec(compile(source, f"s3://{self.bucket}/{report_id}/{module_path}", "exec"), namespace)
+        return namespace[function_name]
+
+    # Sources ----------------------------------------------------------------
+
+    def source_etags(self, sources: Dict[str, str]) -> Dict[str, Optional[str]]:
+        etags = {}
+        for name, path in sources.items():
+            if not path.startswith("s3://"):
+                etags[name] = None
+                continue
+            bucket, key = _split_s3(path)
+            try:
+                etags[name] = self.s3_client.head_object(Bucket=bucket, Key=key).get("ETag")
+            except Exception:
+                etags[name] = None
+        return etags
+
+    def _load_sources(self, sources: Dict[str, str]):
+        import pandas as pd
+
+        frames = {}
+        for name, path in sources.items():
+            if path.startswith("s3://"):
+                bucket, key = _split_s3(path)
+                handle = io.BytesIO(self._get(key, bucket) or b"")
+            else:
+                handle = path
+            if path.endswith(".parquet"):
+                frames[name] = pd.read_parquet(handle)
+            else:
+                frames[name] = pd.read_csv(handle)
+        return frames
+
+    # Jobs -------------------------------------------------------------------
+
+    def read_state(self, report_id, name: str) -> Dict[str, Any]:
+        data = self._get(state_key(report_id, name))
+        return json.loads(data) if data else {}
+
+    def run_report(self, report_id, force: bool = False) -> List[Dict[str, Any]]:
+        """Run every due precomputation of a report; returns one row per result"""
+        config, bundle = self._load_report(report_id)
+        results = []
+        for job in ReportConfig().get_precomputations(config):
+            results.extend(self._run_job(report_id, job, bundle, force))
+        return results
+
+    def _save_state(self, report_id, name: str, state: Dict[str, Any]):
+        self.s3_client.put_object(Bucket=self.bucket, Key=state_key(report_id, name),
+                                  Body=json.dumps(state, default=str).encode("utf-8"))
+
+    def _run_job(self, report_id, job, bundle, force: bool) -> List[Dict[str, Any]]:
+        schedule = CronSchedule(job["schedule"])
+        state = self.read_state(report_id, job["name"])
+        failure = state.get(FAILURE_KEY)
+        if not force and failure is not None and failure["retry_at"] > time.time():
+            return []
+        etags = self.source_etags(job["sources"]) if job["on_change"] else {}
+
+        due = []
+        for params in job["params"]:
+            entry = state.get(params_key(params), {})
+            changed = job["on_change"] and entry.get("source_etags") != etags
+            if force or changed or schedule.is_due(entry.get("computed_at")):
+                due.append(params)
+        if not due:
+            return []
+
+        # Atomic claim, so concurrent runners (replicas, workers) don't duplicate the job
+        lease = f"precompute:{report_id}:{job['name']}"
+        leased = shared_cache.cache.set_if_absent(lease, b"1", LEASE_SECONDS)
+        if not leased and not force:
+            return []
+
+        results = []
+        try:
+            function = self._resolve_function(report_id, job["function"], bundle)
+            sources = self._load_sources(job["sources"])
+            for params in due:
+                start = time.perf_counter()
+                frame = function(sources, **params)
+                buffer = io.BytesIO()
+                frame.to_parquet(buffer, index=False, compression="zstd")
+                key = result_key(report_id, job["name"], params)
+                self.s3_client.put_object(Bucket=self.bucket, Key=key, Body=buffer.getvalue())
+                state[params_key(params)] = {
+                    "params": params,
+                    "computed_at": time.time(),
+                    "seconds": time.perf_counter() - start,
+                    "rows": len(frame),
+                    "bytes": buffer.tell(),
+                    "source_etags": etags,
+                }
+                results.append({"report_id": report_id, "name": job["name"], "key": key,
+                                **state[params_key(params)]})
+            state.pop(FAILURE_KEY, None)
+            self._save_state(report_id, job["name"], state)
+        except Exception as e:
+            attempts = (failure or {}).get("attempts", 0) + 1
+            backoff = min(BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+            state[FAILURE_KEY] = {
+                "error": f"{type(e).__name__}: {e}",
+                "failed_at": time.time(),
+                "attempts": attempts,
+                "retry_at": time.time() + backoff,
+            }
+            try:
+                self._save_state(report_id, job["name"], state)
+            except Exception as save_error:
+                print(f"Error saving precompute state for {report_id}/{job['name']}: {save_error}")
+            raise
+        finally:
+            if leased:
+                shared_cache.cache.invalidate([lease], "precompute done")
+        return results
+
+    def run_catalog(self, report_ids, force: bool = False) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+        """Run every report; returns (results, errors by report id)"""
+        results, errors = [], {}
+        for report_id in report_ids:
+            try:
+                results.extend(self.run_report(report_id, force))
+            except Exception as e:
+                print(f"Error precomputing report {report_id}: {e}")
+                errors[str(report_id)] = f"{type(e).__name__}: {e}"
+        return results, errors
+
+
+class PrecomputedReader:
+    """``precomputed(name, **params)`` helper injected into report code"""
+
+    def __init__(self, report_id, s3_client, bucket: str = S3_BUCKET):
+        self.report_id = report_id
+        self.s3_client = s3_client
+        self.bucket = bucket
+
+    def __call__(self, name: str, **params):
+        """The stored result; a shallow copy, so adding columns doesn't leak across sessions"""
+        import pandas as pd
+
+        key = result_key(self.report_id, name, params)
+        cached = _reader_cache_get(key)
+        if cached is not None and cached["checked_at"] + READER_TTL > time.time():
+            return cached["frame"].copy(deep=False)
+
+        head = self.s3_client.head_object(Bucket=self.bucket, Key=key)
+        if cached is not None and cached["etag"] == head.get("ETag"):
+            cached["checked_at"] = time.time()
+            return cached["frame"].copy(deep=False)
+
+        body = self.s3_client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        frame = pd.read_parquet(io.BytesIO(body))
+        _reader_cache_put(key, {"frame": frame, "etag": head.get("ETag"), "checked_at": time.time()})
+        return frame.copy(deep=False)
+
+
+# Per-process LRU of precomputed frames, shared by every session
+_reader_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_reader_cache_lock = threading.Lock()
+
+
+def _reader_cache_get(key: str) -> Optional[Dict[str, Any]]:
+    with _reader_cache_lock:
+        cached = _reader_cache.get(key)
+        if cached is not None:
+            _reader_cache.move_to_end(key)
+        return cached
+
+
+def _reader_cache_put(key: str, entry: Dict[str, Any]):
+    with _reader_cache_lock:
+        _reader_cache[key] = entry
+        _reader_cache.move_to_end(key)
+        while len(_reader_cache) > READER_CACHE_SIZE:
+            _reader_cache.popitem(last=False)
+
+_scheduler_started = False
+_scheduler_lock = threading.Lock()
+
+
+def reader(report_id, s3_client, bucket: str = S3_BUCKET) -> PrecomputedReader:
+    return PrecomputedReader(report_id, s3_client, bucket)
+
+
+def _active_report_ids(table) -> List[str]:
+    """Active reports from the shared catalog snapshot, or a DynamoDB scan"""
+    catalog = shared_cache.cache.get_catalog()
+    if catalog is not None:
+        return [report_id for report_id, report in catalog.items() if not report.get("deletado")]
+    if table is None:
+        return []
+    return [item["report_id"] for item in table.scan()["Items"]
+            if item.get("report_id") and not item.get("deletado", False)]
+
+
+def start_scheduler(s3_client, table=None, bucket: str = S3_BUCKET) -> bool:
+    """Start the background scheduler once per process"""
+    global _scheduler_started
+    if not SCHEDULER_ENABLED or s3_client is None:
+        return False
+    with _scheduler_lock:
+        if _scheduler_started:
+            return False
+        _scheduler_started = True
+
+    precomputer = Precomputer(s3_client, bucket)
+
+    def loop():
+        while True:
+            try:
+                results, _ = precomputer.run_catalog(_active_report_ids(table))
+                for row in results:
+                    print(f"Precomputed {row['report_id']}/{row['name']} "
+                          f"({row['rows']} rows, {row['bytes']} bytes)")
+            except Exception as e:
+                print(f"Error in precompute scheduler: {e}")
+            time.sleep(SCHEDULER_INTERVAL)
+
+    threading.Thread(target=loop, name="precompute-scheduler", daemon=True).start()
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run declared report precomputations')
+    parser.add_argument('command', choices=['run', 'list'],
+                        help='run due jobs, or list declarations and their state')
+    parser.add_argument('--report-id', '-r', action='append',
+                        help='Report ID (repeatable; default: every active report)')
+    parser.add_argument('--bucket', default=S3_BUCKET, help='S3 bucket')
+    parser.add_argument('--force', action='store_true', help='Run even if not due')
+
+    args = parser.parse_args()
+
+    import boto3
+    s3_client = boto3.client('s3')
+    precomputer = Precomputer(s3_client, args.bucket)
+
+    report_ids = args.report_id or _active_report_ids(boto3.resource('dynamodb').Table('dataiesb-reports'))
+
+    if args.command == 'list':
+        for report_id in report_ids:
+            for job in precomputer.declarations(report_id):
+                state = precomputer.read_state(report_id, job['name'])
+                failure = state.pop(FAILURE_KEY, None)
+                print(f"📊 {report_id}/{job['name']} [{job['schedule']}] "
+                      f"{len(job['params'])} parameter sets, {len(state)} computed")
+                if failure:
+                    print(f"❌ {failure['attempts']} failed attempt(s): {failure['error']}")
+        return
+
+    results, errors = precomputer.run_catalog(report_ids, args.force)
+    for row in results:
+        print(f"✅ s3://{args.bucket}/{row['key']} ({row['rows']} rows, {row['bytes']} bytes, {row['seconds']:.1f}s)")
+    for report_id, error in errors.items():
+        print(f"❌ {report_id}: {error}")
+    if errors:
+        # Lets the CronJob record the run as failed
+        return 1
+    if not results:
+        print("Nothing due")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,537 @@
+"""
+Report Benchmark
+Publish-time performance regression check for a new report version:
+- Runs the report headlessly (Streamlit bare mode) against fixture data
+  mirrored from S3, or the live bucket when no fixtures are given; with
+  fixtures, ``boto3``, ``s3fs`` and fsspec ``s3://`` URLs are redirected too
+- Records first and rerun execution time, peak memory and the payload handed
+  to Streamlit (plus the local bundle load time, informational only: the
+  production S3 fetch is not part of the benchmark)
+- Compares with the last accepted baseline of the same ``report_id`` and blocks
+  (or flags) regressions beyond a threshold
+- Keeps the history per report in ``<report_id>/benchmarks/history.json``
+
+Run it between the linter and the upload:
+
+    python app/report_bench.py path/to/report --report-id 42 --fixtures fixtures/
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, List, Optional
+
+import dataset_store
+import report_bundle
+import report_context
+from report_tracer import ReportTracer
+
+S3_BUCKET = "dataiesb-reports"
+AWS_REGION = "us-east-1"
+DEFAULT_RUNS = 3
+DEFAULT_THRESHOLD = 0.25
+HISTORY_LIMIT = 100
+
+# Metrics compared with the baseline; ``load_seconds`` is recorded but not gated
+METRICS = ["first_exec_seconds", "exec_seconds", "peak_memory_bytes", "payload_bytes"]
+
+# Differences below these are treated as noise whatever the ratio
+NOISE_FLOORS = {
+    "first_exec_seconds": 0.2,
+    "exec_seconds": 0.1,
+    "peak_memory_bytes": 5 * 1024 * 1024,
+    "payload_bytes": 50 * 1024,
+}
+
+
+def history_key(report_id) -> str:
+    return f"{report_id}/benchmarks/history.json"
+
+
+# Fixture-backed S3 --------------------------------------------------------------
+
+
+class _FixtureStore:
+    """Scratch copy of a ``<bucket>/<key>`` fixture tree; the report may write to it"""
+
+    def __init__(self, fixtures: str):
+        self.root = os.path.join(tempfile.mkdtemp(prefix="report-bench-"), "s3")
+        shutil.copytree(fixtures, self.root)
+
+    def path(self, bucket: str, key: str) -> str:
+        return os.path.join(self.root, bucket, *key.split("/"))
+
+    def keys(self, bucket: str, prefix: str = "") -> List[str]:
+        base = os.path.join(self.root, bucket)
+        found = []
+        for root, _, filenames in os.walk(base):
+            for filename in filenames:
+                key = os.path.relpath(os.path.join(root, filename), base).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    found.append(key)
+        return sorted(found)
+
+    @staticmethod
+    def etag(path: str) -> str:
+        stat = os.stat(path)
+        return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+    def cleanup(self):
+        shutil.rmtree(os.path.dirname(self.root), ignore_errors=True)
+
+
+def fixture_filesystem(store: _FixtureStore):
+    """fsspec filesystem class serving ``s3://bucket/key`` from the fixture store"""
+    from fsspec.implementations.local import LocalFileSystem
+
+    class FixtureFileSystem(LocalFileSystem):
+        protocol = ("s3", "s3a")
+
+        def __init__(self, *args, **storage_options):
+            # s3fs options (anon, key, client_kwargs, ...) don't apply to fixtures
+            super().__init__(auto_mkdir=True)
+
+        @classmethod
+        def _strip_protocol(cls, path):
+            if isinstance(path, list):
+                return [cls._strip_protocol(p) for p in path]
+            path = str(path)
+            for prefix in ("s3://", "s3a://"):
+                if path.startswith(prefix):
+                    path = path[len(prefix):]
+                    break
+            else:
+                if path.startswith(store.root):
+                    return path
+            return os.path.join(store.root, path.lstrip("/"))
+
+        def info(self, path, **kwargs):
+            info = super().info(path, **kwargs)
+            if info.get("type") == "file":
+                info["ETag"] = store.etag(self._strip_protocol(path))
+            return info
+
+    return FixtureFileSystem
+
+
+class FixtureS3Client:
+    """The subset of the boto3 S3 client reports use, served from fixtures
+
+    Any other client method fails with a clear message instead of an
+    ``AttributeError`` from inside the report.
+    """
+
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+        ClientError = NoSuchKey
+
+    def __init__(self, store: _FixtureStore):
+        self._store = store
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def unsupported(*args, **kwargs):
+            raise NotImplementedError(f"s3_client.{name}() não é suportado com --fixtures")
+        return unsupported
+
+    def _path(self, Bucket: str, Key: str) -> str:
+        path = self._store.path(Bucket, Key)
+        if not os.path.isfile(path):
+            raise self.exceptions.NoSuchKey(f"s3://{Bucket}/{Key}")
+        return path
+
+    def head_object(self, Bucket: str, Key: str, **kwargs):
+        path = self._path(Bucket, Key)
+        return {"ContentLength": os.path.getsize(path), "ETag": self._store.etag(path)}
+
+    def get_object(self, Bucket: str, Key: str, **kwargs):
+        path = self._path(Bucket, Key)
+        with open(path, "rb") as f:
+            body = f.read()
+        return {"Body": io.BytesIO(body), "ContentLength": len(body), "ETag": self._store.etag(path)}
+
+    def put_object(self, Bucket: str, Key: str, Body=b"", **kwargs):
+        data = Body.encode("utf-8") if isinstance(Body, str) else Body
+        if hasattr(data, "read"):
+            data = data.read()
+        path = self._store.path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        return {"ETag": self._store.etag(path)}
+
+    def download_file(self, Bucket: str, Key: str, Filename: str, **kwargs):
+        shutil.copyfile(self._path(Bucket, Key), Filename)
+
+    def download_fileobj(self, Bucket: str, Key: str, Fileobj, **kwargs):
+        with open(self._path(Bucket, Key), "rb") as f:
+            shutil.copyfileobj(f, Fileobj)
+
+    def upload_file(self, Filename: str, Bucket: str, Key: str, **kwargs):
+        with open(Filename, "rb") as f:
+            self.put_object(Bucket=Bucket, Key=Key, Body=f.read())
+
+    def upload_fileobj(self, Fileobj, Bucket: str, Key: str, **kwargs):
+        self.put_object(Bucket=Bucket, Key=Key, Body=Fileobj.read())
+
+    def delete_object(self, Bucket: str, Key: str, **kwargs):
+        path = self._store.path(Bucket, Key)
+        if os.path.isfile(path):
+            os.remove(path)
+        return {}
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = "", **kwargs):
+        contents = []
+        for key in self._store.keys(Bucket, Prefix):
+            path = self._store.path(Bucket, key)
+            contents.append({"Key": key, "Size": os.path.getsize(path), "ETag": self._store.etag(path)})
+        return {"Contents": contents, "KeyCount": len(contents), "IsTruncated": False}
+
+    def get_paginator(self, operation_name: str):
+        if operation_name != "list_objects_v2":
+            raise NotImplementedError(f"Paginador {operation_name} não é suportado com --fixtures")
+        return _FixturePaginator(self.list_objects_v2)
+
+
+class _FixturePaginator:
+    """Single-page stand-in for a boto3 paginator"""
+
+    def __init__(self, operation):
+        self._operation = operation
+
+    def paginate(self, **kwargs):
+        kwargs.pop("PaginationConfig", None)
+        return iter([self._operation(**kwargs)])
+
+
+@contextmanager
+def redirect_s3(s3_client: FixtureS3Client, fs_class):
+    """Send every S3 access of the run to the fixtures, not only the injected
+    ``s3_client``/``fs``: ``boto3.client("s3")``, ``s3fs.S3FileSystem`` and
+    fsspec ``s3://`` URLs (``pd.read_csv("s3://...")``)"""
+    import boto3.session
+    import fsspec
+    import s3fs
+    from fsspec.registry import _registry
+
+    protocols = ("s3", "s3a")
+    previous_impls = {protocol: _registry.get(protocol) for protocol in protocols}
+    original_client = boto3.session.Session.client
+    original_resource = boto3.session.Session.resource
+    original_s3fs = s3fs.S3FileSystem
+
+    def client(self, service_name, *args, **kwargs):
+        if service_name == "s3":
+            return s3_client
+        return original_client(self, service_name, *args, **kwargs)
+
+    def resource(self, service_name, *args, **kwargs):
+        if service_name == "s3":
+            raise RuntimeError("boto3.resource('s3') não é suportado com --fixtures; use s3_client")
+        return original_resource(self, service_name, *args, **kwargs)
+
+    for protocol in protocols:
+        fsspec.register_implementation(protocol, fs_class, clobber=True)
+    boto3.session.Session.client = client
+    boto3.session.Session.resource = resource
+    s3fs.S3FileSystem = fs_class
+    try:
+        yield
+    finally:
+        s3fs.S3FileSystem = original_s3fs
+        boto3.session.Session.client = original_client
+        boto3.session.Session.resource = original_resource
+        for protocol, impl in previous_impls.items():
+            if impl is None:
+                _registry.pop(protocol, None)
+            else:
+                fsspec.register_implementation(protocol, impl, clobber=True)
+
+
+# History ------------------------------------------------------------------------
+
+
+class S3History:
+    """Benchmark history stored next to the report in S3"""
+
+    def __init__(self, s3_client, bucket: str = S3_BUCKET):
+        self.s3_client = s3_client
+        self.bucket = bucket
+
+    def load(self, report_id) -> List[Dict[str, Any]]:
+        try:
+            body = self.s3_client.get_object(Bucket=self.bucket, Key=history_key(report_id))["Body"].read()
+        except self.s3_client.exceptions.NoSuchKey:
+            return []
+        return json.loads(body)
+
+    def save(self, report_id, history: List[Dict[str, Any]]):
+        self.s3_client.put_object(Bucket=self.bucket, Key=history_key(report_id),
+                                  Body=json.dumps(history, indent=2).encode("utf-8"),
+                                  ContentType="application/json")
+
+
+class LocalHistory:
+    """Benchmark history kept in a local directory (CI caches, development)"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, report_id) -> str:
+        return os.path.join(self.directory, history_key(report_id))
+
+    def load(self, report_id) -> List[Dict[str, Any]]:
+        try:
+            with open(self._path(report_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def save(self, report_id, history: List[Dict[str, Any]]):
+        path = self._path(report_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(history, f, indent=2)
+
+
+def baseline(history: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Last accepted entry of the history"""
+    for entry in reversed(history):
+        if entry.get("status") == "accepted":
+            return entry
+    return None
+
+
+def compare(metrics: Dict[str, float], base: Optional[Dict[str, Any]],
+            threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """Per-metric comparison with the baseline; ``regressed`` marks blocking changes"""
+    if base is None:
+        return []
+    rows = []
+    for metric in METRICS:
+        previous = base["metrics"].get(metric)
+        current = metrics.get(metric)
+        if previous is None or current is None:
+            continue
+        ratio = current / previous if previous else None
+        rows.append({
+            "metric": metric,
+            "baseline": previous,
+            "current": current,
+            "ratio": ratio,
+            "regressed": current - previous > NOISE_FLOORS[metric]
+                         and (ratio is None or ratio > 1 + threshold),
+        })
+    return rows
+
+
+# Runner -------------------------------------------------------------------------
+
+
+def _headless_streamlit():
+    """Import Streamlit for bare-mode execution, without its context warnings"""
+    import streamlit as st
+
+    try:
+        from streamlit import logger
+        logger.set_log_level("error")
+    except Exception:
+        pass
+    return st
+
+
+def load_report(source: str, report_id, version: Optional[str] = None, entrypoint: str = "main.py"):
+    """Load a report directory, bundle .zip or single script; returns (bundle, code, seconds)"""
+    start = time.perf_counter()
+    if os.path.isdir(source):
+        bundle = report_bundle.load_bundle(report_bundle.build_bundle(source, report_id, version, entrypoint))
+        code = bundle.source()
+    elif source.endswith(".zip"):
+        with open(source, "rb") as f:
+            bundle = report_bundle.load_bundle(f.read())
+        code = bundle.source()
+    else:
+        bundle = None
+        with open(source, "r", encoding="utf-8") as f:
+            code = f.read()
+        compile(code, source, "exec")
+    return bundle, code, time.perf_counter() - start
+
+
+def _run_once(st, code: str, report_id, s3_client, fs, bucket: str, datasets, bundle,
+              trace_memory: bool = False) -> Dict[str, Any]:
+    tracer = ReportTracer(report_id, f"report_{report_id}.py")
+    exec_globals = report_context.build_exec_globals(
+        st, report_id, s3_client, fs, bucket, AWS_REGION, tracer=tracer, bundle=bundle, datasets=datasets
+    )
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        tracer.run(code, exec_globals)
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    profile = tracer.profile()
+    return {"exec_seconds": profile["wall_seconds"], "payload_bytes": profile["bytes_sent"],
+            "peak_memory_bytes": peak}
+
+
+def benchmark(source: str, report_id, fixtures: Optional[str] = None, runs: int = DEFAULT_RUNS,
+              bucket: str = S3_BUCKET, version: Optional[str] = None) -> Dict[str, Any]:
+    """Execute the report ``runs`` times plus one memory-traced run and summarize"""
+    bundle, code, load_seconds = load_report(source, report_id, version)
+    st = _headless_streamlit()
+
+    store = _FixtureStore(fixtures) if fixtures else None
+    if store is not None:
+        fs_class = fixture_filesystem(store)
+        s3_client, fs = FixtureS3Client(store), fs_class()
+        redirect = redirect_s3(s3_client, fs_class)
+    else:
+        import boto3
+        import s3fs
+        s3_client, fs = boto3.client("s3", region_name=AWS_REGION), s3fs.S3FileSystem()
+        redirect = nullcontext()
+
+    # A private node store so the first run is cold, as after a fresh deploy
+    datasets_dir = tempfile.mkdtemp(prefix="report-bench-datasets-")
+    datasets = dataset_store.DatasetStore(datasets_dir)
+    try:
+        with redirect:
+            timings = [_run_once(st, code, report_id, s3_client, fs, bucket, datasets, bundle)
+                       for _ in range(max(runs, 1))]
+            # tracemalloc slows execution down, so memory is measured on its own run
+            traced = _run_once(st, code, report_id, s3_client, fs, bucket, datasets, bundle,
+                               trace_memory=True)
+    finally:
+        shutil.rmtree(datasets_dir, ignore_errors=True)
+        if store is not None:
+            store.cleanup()
+
+    reruns = timings[1:] or timings
+    metrics = {
+        "load_seconds": load_seconds,
+        "first_exec_seconds": timings[0]["exec_seconds"],
+        "exec_seconds": statistics.median(t["exec_seconds"] for t in reruns),
+        "peak_memory_bytes": traced["peak_memory_bytes"],
+        "payload_bytes": max(t["payload_bytes"] for t in timings),
+    }
+    return {
+        "report_id": str(report_id),
+        "version": version or (bundle.version if bundle is not None else None),
+        "source_sha256": hashlib.sha256(code.encode("utf-8")).hexdigest(),
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "runs": len(timings),
+        "fixtures": bool(fixtures),
+        "metrics": metrics,
+    }
+
+
+def _format(metric: str, value) -> str:
+    if value is None:
+        return "-"
+    if metric.endswith("_bytes"):
+        return f"{value / (1024 * 1024):.2f} MB"
+    return f"{value:.3f}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Publish-time performance regression check for reports')
+    parser.add_argument('source', help='Report directory, bundle .zip or main.py')
+    parser.add_argument('--report-id', '-r', required=True, help='Report ID')
+    parser.add_argument('--version', '-v', help='Version label stored in the history')
+    parser.add_argument('--fixtures', help='Directory mirroring S3 as <bucket>/<key> with sampled data')
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS, help='Timed executions')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Allowed relative increase over the baseline (0.25 = +25%%)')
+    parser.add_argument('--mode', choices=['block', 'warn'], default='block',
+                        help='Exit with status 1 on regressions, or only report them')
+    parser.add_argument('--accept', action='store_true',
+                        help='Accept the new numbers as the baseline even if they regressed')
+    parser.add_argument('--bucket', default=S3_BUCKET, help='S3 bucket holding the history')
+    parser.add_argument('--history-dir', help='Keep the history in this directory instead of S3')
+    parser.add_argument('--no-record', action='store_true', help='Do not append to the history')
+    parser.add_argument('--output', '-o', help='Write the JSON result to this file')
+
+    args = parser.parse_args()
+
+    if args.history_dir:
+        history_store = LocalHistory(args.history_dir)
+    else:
+        import boto3
+        history_store = S3History(boto3.client('s3', region_name=AWS_REGION), args.bucket)
+
+    try:
+        entry = benchmark(args.source, args.report_id, args.fixtures, args.runs, args.bucket, args.version)
+    except (report_bundle.BundleError, OSError, SyntaxError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ Report failed during the benchmark: {type(e).__name__}: {e}")
+        sys.exit(1)
+
+    history = history_store.load(args.report_id)
+    base = baseline(history)
+    comparison = compare(entry["metrics"], base, args.threshold)
+    regressions = [row for row in comparison if row["regressed"]]
+
+    if regressions and not args.accept:
+        # Flagged runs are kept for inspection but never become the baseline
+        entry["status"] = "blocked" if args.mode == 'block' else "flagged"
+    else:
+        entry["status"] = "accepted"
+    blocked = entry["status"] == "blocked"
+    entry["regressions"] = [row["metric"] for row in regressions]
+    entry["baseline_version"] = base.get("version") if base else None
+
+    print(f"📊 Report {args.report_id} ({entry['runs']} runs, "
+          f"{'fixtures' if entry['fixtures'] else 'live data'})")
+    for metric in METRICS:
+        row = next((r for r in comparison if r["metric"] == metric), None)
+        line = f"  {metric:<20} {_format(metric, entry['metrics'][metric]):>12}"
+        if row is not None:
+            change = f"{(row['ratio'] - 1) * 100:+.0f}%" if row["ratio"] is not None else "new"
+            line += f"  baseline {_format(metric, row['baseline']):>12}  {change}"
+            if row["regressed"]:
+                line += "  ⚠️ regression"
+        print(line)
+    print(f"  {'load_seconds':<20} {_format('load_seconds', entry['metrics']['load_seconds']):>12}  "
+          f"(local bundle load, not gated)")
+
+    if not args.no_record:
+        history = (history + [entry])[-HISTORY_LIMIT:]
+        history_store.save(args.report_id, history)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"entry": entry, "comparison": comparison}, f, indent=2)
+
+    if base is None:
+        print("✅ No baseline yet for this report")
+    elif blocked:
+        print(f"❌ Performance regression beyond {args.threshold:.0%} - upload blocked "
+              f"(use --accept if intended)")
+        sys.exit(1)
+    elif regressions:
+        print(f"⚠️ Performance regression beyond {args.threshold:.0%} in {', '.join(entry['regressions'])} "
+              f"- not used as baseline (use --accept if intended)")
+    else:
+        print("✅ No performance regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Report Bundles
+Versioned single-file package for a report, fetched with one S3 GET:
+
+    <report_id>/bundle.zip               current version
+    <report_id>/bundles/<version>.zip    every published version
+
+Each archive holds:
+- ``manifest.json``: format, report id, version, Python cache tag, entrypoint and
+  the SHA-256 of every file (checked on load)
+- the sources (``main.py`` and helper modules/packages), ``config.toml`` and
+  small assets (CSV, GeoJSON, images, ...)
+- ``__bytecode__/<path>.<cache_tag>.marshal``: precompiled code objects, used when
+  the runtime matches the Python that built the bundle
+
+Helper modules are imported from memory into a namespace private to each
+bundle; ``sys.modules`` is never touched, so concurrent sessions and the
+precompute scheduler can run reports with same-named helpers side by side.
+"""
+
+import argparse
+import builtins
+import hashlib
+import importlib.util
+import io
+import json
+import marshal
+import os
+import sys
+import threading
+import time
+import types
+import zipfile
+from typing import Any, Dict, Optional
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+BYTECODE_DIR = "__bytecode__"
+DEFAULT_ENTRYPOINT = "main.py"
+# Values of the ``artifact`` attribute of a report's DynamoDB item
+ARTIFACT_BUNDLE = "bundle"
+ARTIFACT_SCRIPT = "main.py"
+MAX_ASSET_BYTES = 5 * 1024 * 1024
+EXCLUDED_DIRS = {"__pycache__", ".git", ".venv", "venv", ".ipynb_checkpoints"}
+
+
+class BundleError(Exception):
+    """Invalid, corrupted or incompatible report bundle"""
+
+
+def bundle_key(report_id) -> str:
+    return f"{report_id}/bundle.zip"
+
+
+def versioned_bundle_key(report_id, version: str) -> str:
+    return f"{report_id}/bundles/{version}.zip"
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _code_filename(report_id, path: str) -> str:
+    return f"bundle://{report_id}/{path}"
+
+
+def build_bundle(src_dir: str, report_id, version: Optional[str] = None,
+                 entrypoint: str = DEFAULT_ENTRYPOINT,
+                 max_asset_bytes: int = MAX_ASSET_BYTES) -> bytes:
+    """Package ``src_dir`` into a bundle and return the archive bytes"""
+    version = version or time.strftime("%Y%m%d%H%M%S", time.gmtime())
+    files: Dict[str, bytes] = {}
+
+    for root, dirs, filenames in os.walk(src_dir):
+        dirs[:] = sorted(d for d in dirs if d not in EXCLUDED_DIRS and not d.startswith("."))
+        for filename in sorted(filenames):
+            if filename.startswith(".") or filename.endswith((".pyc", ".zip")):
+                continue
+            full_path = os.path.join(root, filename)
+            rel_path = os.path.relpath(full_path, src_dir).replace(os.sep, "/")
+            size = os.path.getsize(full_path)
+            if not rel_path.endswith(".py") and size > max_asset_bytes:
+                raise BundleError(f"Asset too large for a bundle ({size} bytes): {rel_path}")
+            with open(full_path, "rb") as f:
+                files[rel_path] = f.read()
+
+    if entrypoint not in files:
+        raise BundleError(f"Entrypoint not found: {entrypoint}")
+
+    cache_tag = sys.implementation.cache_tag
+    manifest = {
+        "format": FORMAT_VERSION,
+        "report_id": str(report_id),
+        "version": version,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": cache_tag,
+        "entrypoint": entrypoint,
+        "files": {},
+        "bytecode": {},
+    }
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for rel_path, data in files.items():
+            archive.writestr(rel_path, data)
+            manifest["files"][rel_path] = {"sha256": _sha256(data), "size": len(data)}
+
+            if rel_path.endswith(".py"):
+                try:
+                    code = compile(data, _code_filename(report_id, rel_path), "exec", dont_inherit=True)
+                except SyntaxError as e:
+                    raise BundleError(f"Syntax error in {rel_path}:{e.lineno}: {e.msg}")
+                bytecode = marshal.dumps(code)
+                bytecode_path = f"{BYTECODE_DIR}/{rel_path}.{cache_tag}.marshal"
+                archive.writestr(bytecode_path, bytecode)
+                manifest["bytecode"][rel_path] = {"path": bytecode_path, "sha256": _sha256(bytecode)}
+
+        archive.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
+
+    return buffer.getvalue()
+
+
+class ReportBundle:
+    """A verified bundle held in memory"""
+
+    def __init__(self, data: bytes):
+        try:
+            archive = zipfile.ZipFile(io.BytesIO(data))
+            self.manifest = json.loads(archive.read(MANIFEST_NAME))
+        except (zipfile.BadZipFile, KeyError, ValueError) as e:
+            raise BundleError(f"Bundle inválido: {e}")
+
+        if self.manifest.get("format") != FORMAT_VERSION:
+            raise BundleError(f"Formato de bundle não suportado: {self.manifest.get('format')}")
+
+        self.report_id = self.manifest["report_id"]
+        self.version = self.manifest["version"]
+        self.entrypoint = self.manifest["entrypoint"]
+        self.files: Dict[str, bytes] = {}
+        for path, info in self.manifest["files"].items():
+            content = archive.read(path)
+            if _sha256(content) != info["sha256"]:
+                raise BundleError(f"Hash inválido para {path}")
+            self.files[path] = content
+
+        # Bytecode is only trusted when built by the same interpreter version
+        self._bytecode: Dict[str, bytes] = {}
+        if self.manifest.get("python") == sys.implementation.cache_tag:
+            for path, info in self.manifest.get("bytecode", {}).items():
+                content = archive.read(info["path"])
+                if _sha256(content) != info["sha256"]:
+                    raise BundleError(f"Hash inválido para {info['path']}")
+                self._bytecode[path] = content
+        self._code_cache: Dict[str, Any] = {}
+        self._config: Optional[Dict[str, Any]] = None
+        self._modules: Dict[str, types.ModuleType] = {}
+        self._import_lock = threading.RLock()
+        self._builtins = dict(builtins.__dict__, __import__=self._import)
+
+    @property
+    def uses_bytecode(self) -> bool:
+        return bool(self._bytecode)
+
+    def source(self, path: Optional[str] = None) -> str:
+        return self.files[path or self.entrypoint].decode("utf-8")
+
+    def code(self, path: Optional[str] = None):
+        """Code object for a module, from bytecode when compatible"""
+        path = path or self.entrypoint
+        code = self._code_cache.get(path)
+        if code is None:
+            if path in self._bytecode:
+                code = marshal.loads(self._bytecode[path])
+            else:
+                code = compile(self.files[path], _code_filename(self.report_id, path), "exec",
+                               dont_inherit=True)
+            self._code_cache[path] = code
+        return code
+
+    # Access for report code -------------------------------------------------
+
+    def read(self, name: str) -> bytes:
+        """Raw content of a bundled file"""
+        return self.files[name]
+
+    def open(self, name: str):
+        """Binary file object for a bundled file (``pd.read_csv(bundle.open(...))``)"""
+        return io.BytesIO(self.files[name])
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """Parsed ``config.toml`` (empty when the bundle has none)"""
+        if self._config is None:
+            self._config = {}
+            if "config.toml" in self.files:
+                import toml
+                self._config = toml.loads(self.files["config.toml"].decode("utf-8"))
+        return self._config
+
+    # Module lookup ----------------------------------------------------------
+
+    def module_path(self, fullname: str):
+        """(path, is_package) of a bundled module, or None"""
+        base = fullname.replace(".", "/")
+        if f"{base}/__init__.py" in self.files:
+            return f"{base}/__init__.py", True
+        if f"{base}.py" in self.files:
+            return f"{base}.py", False
+        return None
+
+    def module_names(self):
+        names = set()
+        for path in self.files:
+            if path.endswith(".py") and path != self.entrypoint:
+                name = path[:-3].replace("/", ".")
+                names.add(name[:-len(".__init__")] if name.endswith(".__init__") else name)
+        return names
+
+    def bind(self, namespace: Dict[str, Any]) -> Dict[str, Any]:
+        """Make the bundle's helper modules importable from code run in ``namespace``"""
+        namespace["__builtins__"] = self._builtins
+        return namespace
+
+    def import_module(self, fullname: str) -> types.ModuleType:
+        """Import a bundled module (and its parent packages) into the bundle namespace"""
+        with self._import_lock:
+            module = self._modules.get(fullname)
+            if module is not None:
+                return module
+            found = self.module_path(fullname)
+            if found is None:
+                raise ModuleNotFoundError(f"No module named '{fullname}' in bundle", name=fullname)
+            parent_name, _, child = fullname.rpartition(".")
+            parent = self.import_module(parent_name) if parent_name else None
+
+            module_path, is_package = found
+            module = types.ModuleType(fullname)
+            module.__file__ = _code_filename(self.report_id, module_path)
+            module.__package__ = fullname if is_package else parent_name
+            if is_package:
+                module.__path__ = []
+            self.bind(module.__dict__)
+            # Registered before running so circular imports see the partial module
+            self._modules[fullname] = module
+            try:
+                exec(self.code(module_path), module.__dict__)
+            except BaseException:
+                del self._modules[fullname]
+                raise
+            if parent is not None:
+                setattr(parent, child, module)
+            return module
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        """``__import__`` of bundled code: bundle modules first, then the regular import"""
+        fullname = name
+        if level > 0:
+            package = (globals or {}).get("__package__") or ""
+            fullname = importlib.util.resolve_name("." * level + name, package)
+        top = fullname.partition(".")[0]
+        if not fullname or self.module_path(top) is None:
+            return builtins.__import__(name, globals, locals, fromlist, level)
+
+        module = self.import_module(fullname)
+        if not fromlist:
+            return self.import_module(top) if level == 0 else module
+        for item in fromlist:
+            if item != "*" and not hasattr(module, item) and self.module_path(f"{fullname}.{item}"):
+                self.import_module(f"{fullname}.{item}")
+        return module
+
+
+def load_bundle(data: bytes) -> ReportBundle:
+    return ReportBundle(data)
+
+
+def record_publish(table, report_id, artifact: str = ARTIFACT_BUNDLE):
+    """Update the report's DynamoDB item: artifact type (so loaders GET one key)
+    and ``updated_at`` (so every replica drops its cached copy)"""
+    table.update_item(
+        Key={"report_id": str(report_id)},
+        UpdateExpression="SET artifact = :artifact, updated_at = :updated_at",
+        ExpressionAttributeValues={
+            ":artifact": artifact,
+            ":updated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+    )
+
+
+def publish_bundle(s3_client, bucket: str, data: bytes, upload_entrypoint: bool = True,
+                   table=None) -> Dict[str, str]:
+    """Upload a bundle as the current and a versioned object"""
+    bundle = ReportBundle(data)
+    keys = {
+        "versioned": versioned_bundle_key(bundle.report_id, bundle.version),
+        "current": bundle_key(bundle.report_id),
+    }
+    s3_client.put_object(Bucket=bucket, Key=keys["versioned"], Body=data, ContentType="application/zip")
+    s3_client.put_object(Bucket=bucket, Key=keys["current"], Body=data, ContentType="application/zip")
+    if upload_entrypoint:
+        # Keep <report_id>/main.py in sync for loaders that don't read bundles
+        keys["entrypoint"] = f"{bundle.report_id}/main.py"
+        s3_client.put_object(Bucket=bucket, Key=keys["entrypoint"], Body=bundle.read(bundle.entrypoint))
+    if table is not None:
+        record_publish(table, bundle.report_id)
+    return keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build, inspect and publish report bundles')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='Build a bundle from a report directory')
+    publish_parser = subparsers.add_parser('publish', help='Build (or read) a bundle and upload it to S3')
+    for sub in (build_parser, publish_parser):
+        sub.add_argument('source', help='Report directory (or an existing .zip for publish)')
+        sub.add_argument('--report-id', '-r', help='Report ID')
+        sub.add_argument('--version', '-v', help='Bundle version (default: UTC timestamp)')
+        sub.add_argument('--entrypoint', default=DEFAULT_ENTRYPOINT, help='Entrypoint script')
+    build_parser.add_argument('--output', '-o', help='Output .zip path')
+    publish_parser.add_argument('--bucket', default='dataiesb-reports', help='S3 bucket')
+    publish_parser.add_argument('--no-entrypoint', action='store_true',
+                                help='Do not update <report_id>/main.py')
+    publish_parser.add_argument('--table', default='dataiesb-reports',
+                                help='DynamoDB table of the report catalog')
+    publish_parser.add_argument('--no-catalog', action='store_true',
+                                help='Do not update the report item in DynamoDB')
+
+    inspect_parser = subparsers.add_parser('inspect', help='Verify a bundle and print its manifest')
+    inspect_parser.add_argument('source', help='Bundle .zip path')
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'inspect' or (args.command == 'publish' and args.source.endswith('.zip')):
+            with open(args.source, 'rb') as f:
+                data = f.read()
+        else:
+            if not args.report_id:
+                parser.error('--report-id is required when building from a directory')
+            data = build_bundle(args.source, args.report_id, args.version, args.entrypoint)
+        bundle = ReportBundle(data)
+    except (BundleError, OSError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if args.command == 'inspect':
+        print(json.dumps(bundle.manifest, indent=2))
+        print(f"✅ Bundle OK ({len(bundle.files)} files, bytecode: {bundle.uses_bytecode})")
+    elif args.command == 'build':
+        output = args.output or f"report_{bundle.report_id}_{bundle.version}.zip"
+        with open(output, 'wb') as f:
+            f.write(data)
+        print(f"✅ Bundle {bundle.report_id}@{bundle.version} -> {output} ({len(data)} bytes)")
+    else:
+        import boto3
+        table = None if args.no_catalog else boto3.resource('dynamodb', region_name='us-east-1').Table(args.table)
+        keys = publish_bundle(boto3.client('s3'), args.bucket, data, not args.no_entrypoint, table)
+        for key in keys.values():
+            print(f"✅ s3://{args.bucket}/{key}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,14 @@ Each report has its own TOML configuration file that defines:
 - Report metadata (title, description, author)
 - Streamlit theme configuration
 - Custom styling options
+- Scheduled precomputations ([[precompute]] tables)
 """
 
 import os
 import shutil
 import tempfile
 import toml
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 class ReportConfig:
     def __init__(self, config_dir: str = None):
@@ -80,3 +81,20 @@ class ReportConfig:
             'enable_footer': report_section.get('enable_footer', True),
             'custom_css': report_section.get('custom_css', '')
         }
+    
+    def get_precomputations(self, config_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Extract declared precomputations from configuration"""
+        precomputations = []
+        for entry in config_data.get('precompute', []):
+            if not entry.get('name') or not entry.get('function'):
+                print(f"Ignoring precompute entry without name/function: {entry}")
+                continue
+            precomputations.append({
+                'name': entry['name'],
+                'function': entry['function'],
+                'sources': entry.get('sources', {}),
+                'params': entry.get('params', [{}]) or [{}],
+                'schedule': entry.get('schedule', '@daily'),
+                'on_change': entry.get('on_change', True)
+            })
+        return precomputations
@@ -0,0 +1,63 @@
+"""
+Report Execution Context
+Globals handed to report code, built in one place so the app and the
+publish-time benchmark run reports in the same environment:
+- ``st`` (optionally traced), pandas, boto3/s3fs clients and bucket settings
+- Shared services: ``geo``, ``db``, ``datasets``, ``precomputed``, ``stream``
+- ``bundle`` and its private helper-module imports for multi-file reports
+"""
+
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+import dataset_store
+import db_pool
+import geometry_cache
+import precompute
+import stream_reader
+from report_tracer import ReportTracer, StreamlitWrapper
+
+
+def build_exec_globals(st, report_id, s3_client, fs, bucket: str, region: str,
+                       tracer: Optional[ReportTracer] = None, bundle=None,
+                       datasets: Optional[dataset_store.DatasetStore] = None) -> Dict[str, Any]:
+    """Globals for executing the code of report ``report_id``"""
+    import boto3
+    import pandas as pd
+    import s3fs
+
+    st_wrapper = StreamlitWrapper(st, tracer)
+    exec_globals = {
+        "__name__": "__main__",
+        "st": st_wrapper,
+        "pd": pd,
+        "boto3": boto3,
+        "s3_client": s3_client,
+        "S3_BUCKET": bucket,
+        "AWS_REGION": region,
+        "s3fs": s3fs,
+        "fs": fs,
+        "os": os,
+        "tempfile": tempfile,
+        "geo": geometry_cache.service,
+        "db": db_pool.registry,
+        "datasets": datasets or dataset_store.store,
+        "precomputed": precompute.reader(report_id, s3_client, bucket),
+        "stream": stream_reader.StreamReader(st_wrapper, fs),
+    }
+
+    # Import additional modules that might be needed
+    try:
+        import plotly.express as px
+        import plotly.io as pio
+        exec_globals["px"] = px
+        exec_globals["pio"] = pio
+    except ImportError:
+        pass
+
+    if bundle is not None:
+        # Multi-file report: helper modules and assets come from the bundle
+        exec_globals["bundle"] = bundle
+        bundle.bind(exec_globals)
+    return exec_globals
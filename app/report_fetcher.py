@@ -0,0 +1,175 @@
+"""
+Report Fetcher
+Background download of report artifacts so the loader can overlap the S3 round
+trip with rendering the navbar, CSS, catalog and header:
+- A single ``get_object`` straight into memory (no HEAD, no temp file)
+- The catalog's ``artifact`` attribute says whether to GET ``<report_id>/bundle.zip``
+  or ``<report_id>/main.py``; without it ``bundle.zip`` is tried first (a bundle
+  also uploads its entrypoint as ``main.py``) and a script found by guessing is
+  not cached
+- Started as soon as the report id is known, joined right before ``exec``
+- Artifacts are kept in the shared cache tier and revalidated on every load
+  with a conditional GET (``If-None-Match``); a changed ETag invalidates them
+  on every replica
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import report_bundle
+import shared_cache
+
+FETCH_WORKERS = 4
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+class ReportNotFound(Exception):
+    """The report artifact does not exist in S3"""
+
+    def __init__(self, key: str):
+        super().__init__(key)
+        self.key = key
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="report-fetch")
+        return _executor
+
+
+def is_missing(s3_client, error: Exception) -> bool:
+    """NoSuchKey, or the 403 S3 returns for missing keys without ``s3:ListBucket``"""
+    if isinstance(error, s3_client.exceptions.NoSuchKey):
+        return True
+    code = str(getattr(error, "response", {}).get("Error", {}).get("Code", ""))
+    return code in ("NoSuchKey", "404", "AccessDenied", "403")
+
+
+def catalog_artifact_type(report_id) -> Optional[str]:
+    """Artifact type recorded in the catalog snapshot, if known"""
+    catalog = shared_cache.cache.get_catalog() or {}
+    return (catalog.get(str(report_id)) or {}).get("artifact") or None
+
+
+def _candidate_keys(report_id, artifact_type: Optional[str]):
+    bundle, script = report_bundle.bundle_key(report_id), f"{report_id}/main.py"
+    if artifact_type == report_bundle.ARTIFACT_BUNDLE:
+        return [bundle]
+    if artifact_type == report_bundle.ARTIFACT_SCRIPT:
+        return [script]
+    # Unknown (cold catalog, older items): publish_bundle also uploads main.py,
+    # so only the bundle carries the helper modules
+    return [bundle, script]
+
+
+def _download(s3_client, bucket: str, report_id, artifact_type: Optional[str] = None):
+    """GET the report artifact; returns (key, etag, body)"""
+    keys = _candidate_keys(report_id, artifact_type)
+    for key in keys:
+        try:
+            response = s3_client.get_object(Bucket=bucket, Key=key)
+        except Exception as e:
+            if is_missing(s3_client, e):
+                continue
+            raise
+        return key, response.get("ETag"), response["Body"].read()
+    raise ReportNotFound(keys[0])
+
+
+def _artifact(key: str, etag: Optional[str], body: bytes) -> Dict[str, Any]:
+    if key.endswith(".zip"):
+        bundle = report_bundle.load_bundle(body)
+        return {"key": key, "etag": etag, "code": bundle.source(), "bundle": bundle}
+    return {"key": key, "etag": etag, "code": body.decode("utf-8"), "bundle": None}
+
+
+def _revalidate(s3_client, bucket: str, artifact: Dict[str, Any]):
+    """Conditional GET of a cached artifact; returns (etag, body) when it changed, else None"""
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=artifact["key"], IfNoneMatch=artifact["etag"])
+    except Exception as e:
+        code = str(getattr(e, "response", {}).get("Error", {}).get("Code", ""))
+        if code in ("304", "NotModified"):
+            return None
+        raise
+    return response.get("ETag"), response["Body"].read()
+
+
+def _store(cache, cache_key: str, key: str, etag: Optional[str], body: bytes) -> Dict[str, Any]:
+    """Cache a downloaded artifact, telling other processes when its ETag changed"""
+    artifact = _artifact(key, etag, body)
+    etag_key = f"{cache_key}:etag"
+    previous_etag = cache.get_json(etag_key)
+    if previous_etag is not None and previous_etag != etag:
+        # Other replicas may still hold the previous version in memory
+        cache.invalidate([cache_key], "etag")
+    cache.set_json(etag_key, etag)
+    header = json.dumps({"key": key, "etag": etag}).encode("utf-8")
+    cache.set_bytes(cache_key, header + b"\n" + body, shared_cache.ARTIFACT_TTL)
+    cache.set_local(cache_key, artifact, shared_cache.ARTIFACT_TTL)
+    return artifact
+
+
+def fetch_report_code(s3_client, bucket: str, report_id, artifact_type: Optional[str] = None) -> Dict[str, Any]:
+    """Return the report bundle, or its ``main.py``, from the cache tier or S3
+
+    ``artifact_type`` comes from the catalog item; when omitted the catalog
+    snapshot is consulted. Cached artifacts are revalidated with a conditional
+    GET on every load, so a new upload is picked up right away even when the
+    catalog did not change.
+    """
+    start = time.perf_counter()
+    cache = shared_cache.cache
+    cache_key = shared_cache.artifact_key(report_id)
+    artifact_type = artifact_type or catalog_artifact_type(report_id)
+
+    artifact = cache.get_local(cache_key)
+    source = "local"
+    if artifact is None:
+        raw = cache.get_bytes(cache_key)
+        source = "shared"
+        if raw is not None:
+            header, body = raw.split(b"\n", 1)
+            header = json.loads(header)
+            artifact = _artifact(header["key"], header["etag"], body)
+            cache.set_local(cache_key, artifact, shared_cache.ARTIFACT_TTL)
+
+    if artifact is not None and artifact["key"] not in _candidate_keys(report_id, artifact_type):
+        # The report switched between main.py and a bundle
+        artifact = None
+    if artifact is not None and artifact["etag"]:
+        try:
+            changed = _revalidate(s3_client, bucket, artifact)
+        except Exception as e:
+            if not is_missing(s3_client, e):
+                raise
+            artifact = None
+        else:
+            if changed is not None:
+                source = "s3"
+                artifact = _store(cache, cache_key, artifact["key"], *changed)
+
+    if artifact is None:
+        source = "s3"
+        key, etag, body = _download(s3_client, bucket, report_id, artifact_type)
+        if artifact_type is None and not key.endswith(".zip"):
+            # Picked main.py on a guess: run it, but let the next load ask again
+            artifact = _artifact(key, etag, body)
+        else:
+            artifact = _store(cache, cache_key, key, etag, body)
+
+    return dict(artifact, source=source, fetch_seconds=time.perf_counter() - start)
+
+
+def prefetch(s3_client, bucket: str, report_id, artifact_type: Optional[str] = None) -> Optional[Future]:
+    """Start fetching a report in the background"""
+    if s3_client is None or not report_id:
+        return None
+    return _get_executor().submit(fetch_report_code, s3_client, bucket, report_id, artifact_type)
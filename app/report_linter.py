@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Report Performance Linter
+Static (AST) analysis of report ``main.py`` scripts before they are published:
+- Uncached reads of whole datasets (S3 CSV/Parquet) that run on every rerun
+- ``iterrows()`` loops and row-wise ``apply(axis=1)``
+- Charts fed with raw, unaggregated frames
+- AWS/database clients created on every run instead of cached
+Writes a machine-readable JSON report and exits non-zero when findings reach
+the ``--fail-on`` severity, so uploads can be gated on it.
+"""
+
+import argparse
+import ast
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+SEVERITIES = ["info", "warning", "error"]
+
+CACHE_DECORATORS = {"cache_data", "cache_resource", "cache", "memo", "experimental_memo",
+                    "experimental_singleton", "lru_cache"}
+READ_FUNCS = {"read_csv", "read_parquet", "read_excel", "read_json", "read_feather",
+              "read_table", "read_orc", "read_sql", "read_sql_query", "read_sql_table",
+              "read_file"}
+S3_READ_METHODS = {("fs", "open"), ("fs", "cat"), ("fs", "cat_file"), ("fs", "get"),
+                   ("s3_client", "get_object"), ("s3_client", "download_file"),
+                   ("s3_client", "download_fileobj")}
+CLIENT_FACTORIES = {("boto3", "client"), ("boto3", "resource"), ("boto3", "Session"),
+                    ("s3fs", "S3FileSystem"), ("sqlalchemy", "create_engine"),
+                    ("trino.dbapi", "connect"), ("psycopg2", "connect")}
+CLIENT_NAMES = {"create_engine", "S3FileSystem"}
+AGG_METHODS = {"groupby", "agg", "aggregate", "pivot_table", "pivot", "value_counts",
+               "resample", "sample", "head", "tail", "nlargest", "nsmallest", "describe",
+               "sum", "mean", "median", "count", "size", "crosstab", "rolling"}
+ST_CHARTS = {"line_chart", "bar_chart", "area_chart", "scatter_chart", "map"}
+PLOT_MODULES = {"px", "sns", "alt"}
+
+
+def _dotted_name(node) -> Optional[str]:
+    """Return ``a.b.c`` for attribute/name chains, None otherwise"""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+        return ".".join(reversed(parts))
+    return None
+
+
+def _is_cache_decorator(node) -> bool:
+    target = node.func if isinstance(node, ast.Call) else node
+    name = _dotted_name(target) or ""
+    return name.split(".")[-1] in CACHE_DECORATORS
+
+
+def _literal_path(call: ast.Call) -> Optional[str]:
+    """First string literal argument of a read call, if any"""
+    candidates = list(call.args[:1]) + [kw.value for kw in call.keywords
+                                        if kw.arg in ("filepath_or_buffer", "path", "Key", "path_or_buf")]
+    for arg in candidates:
+        if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+            return arg.value
+        if isinstance(arg, ast.JoinedStr):
+            prefix = "".join(v.value for v in arg.values
+                             if isinstance(v, ast.Constant) and isinstance(v.value, str))
+            return prefix or None
+    return None
+
+
+def _read_call(node) -> Optional[tuple]:
+    """(owner, attr) when ``node`` is a dataset read call, None otherwise"""
+    if not isinstance(node, ast.Call):
+        return None
+    parts = (_dotted_name(node.func) or "").split(".")
+    owner, attr = ".".join(parts[:-1]), parts[-1]
+    if attr in READ_FUNCS or (owner, attr) in S3_READ_METHODS:
+        return owner, attr
+    return None
+
+
+def _contains_call(node, names) -> bool:
+    for child in ast.walk(node):
+        if isinstance(child, ast.Call):
+            func = child.func
+            attr = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+            if attr in names:
+                return True
+    return False
+
+
+class ReportLinter(ast.NodeVisitor):
+    """Walks a report script and collects performance findings"""
+
+    def __init__(self, filename: str = "main.py"):
+        self.filename = filename
+        self.findings: List[Dict[str, Any]] = []
+        self.reads: List[Dict[str, Any]] = []
+        self._cached_depth = 0
+        self._loop_depth = 0
+        self._raw_frames = set()
+        # Reads nested in the arguments of another read, counted with the outer one
+        self._nested_reads = set()
+
+    def add(self, rule: str, severity: str, node, message: str):
+        self.findings.append({
+            "rule": rule,
+            "severity": severity,
+            "file": self.filename,
+            "line": getattr(node, "lineno", 0),
+            "col": getattr(node, "col_offset", 0),
+            "message": message,
+        })
+
+    # Scopes -----------------------------------------------------------------
+
+    def _visit_function(self, node):
+        cached = any(_is_cache_decorator(d) for d in node.decorator_list)
+        self._cached_depth += cached
+        self.generic_visit(node)
+        self._cached_depth -= cached
+
+    visit_FunctionDef = _visit_function
+    visit_AsyncFunctionDef = _visit_function
+
+    def _visit_loop(self, node):
+        self._loop_depth += 1
+        self.generic_visit(node)
+        self._loop_depth -= 1
+
+    visit_For = _visit_loop
+    visit_While = _visit_loop
+    visit_AsyncFor = _visit_loop
+
+    # Data flow --------------------------------------------------------------
+
+    def visit_Assign(self, node):
+        self.generic_visit(node)
+        targets = [t.id for t in node.targets if isinstance(t, ast.Name)]
+        if not targets:
+            return
+        value = node.value
+        if _contains_call(value, AGG_METHODS):
+            self._raw_frames.difference_update(targets)
+        elif _contains_call(value, READ_FUNCS) or self._derives_from_raw(value):
+            self._raw_frames.update(targets)
+        else:
+            self._raw_frames.difference_update(targets)
+
+    def _derives_from_raw(self, node) -> bool:
+        return any(isinstance(n, ast.Name) and n.id in self._raw_frames for n in ast.walk(node))
+
+    # Calls ------------------------------------------------------------------
+
+    def visit_Call(self, node):
+        name = _dotted_name(node.func) or ""
+        parts = name.split(".")
+        attr = parts[-1]
+        owner = ".".join(parts[:-1])
+
+        if _read_call(node) and id(node) not in self._nested_reads:
+            self._check_read(node, owner, attr)
+        if attr == "iterrows":
+            self.add("iterrows", "warning", node,
+                     "iterrows() is row-by-row Python; use vectorized operations or itertuples()")
+        if attr == "apply" and any(kw.arg == "axis" and isinstance(kw.value, ast.Constant)
+                                   and kw.value.value in (1, "columns") for kw in node.keywords):
+            self.add("apply-axis-1", "info", node,
+                     "apply(axis=1) calls Python per row; prefer vectorized column operations")
+        if (owner, attr) in CLIENT_FACTORIES or attr in CLIENT_NAMES:
+            if not self._cached_depth:
+                self.add("client-per-run", "warning", node,
+                         f"{name}() creates a new client on every rerun; use the injected "
+                         "s3_client/fs/db or wrap it in @st.cache_resource")
+        self._check_plot(node, owner, attr)
+        self.generic_visit(node)
+
+    def _check_read(self, node, owner: str, attr: str):
+        # pd.read_csv(fs.open("s3://...")) is one logical read, reported once
+        inner = [child for arg in node.args + [kw.value for kw in node.keywords]
+                 for child in ast.walk(arg) if _read_call(child)]
+        self._nested_reads.update(id(child) for child in inner)
+        path = _literal_path(node) or next(filter(None, map(_literal_path, inner)), None)
+        is_s3 = (owner in ("fs", "s3_client") or (path or "").startswith("s3://")
+                 or any(_read_call(child)[0] in ("fs", "s3_client") for child in inner))
+        read = {
+            "line": node.lineno,
+            "call": f"{owner}.{attr}" if owner else attr,
+            "path": path,
+            "s3": is_s3,
+            "cached": bool(self._cached_depth),
+            "in_loop": bool(self._loop_depth),
+        }
+        self.reads.append(read)
+        if self._cached_depth:
+            return
+        severity = "error" if is_s3 else "warning"
+        where = f" ({path})" if path else ""
+        message = f"{read['call']}{where} runs on every rerun; wrap the loader in @st.cache_data"
+        if self._loop_depth:
+            message += " (inside a loop)"
+        self.add("uncached-read", severity, node, message)
+
+    def _check_plot(self, node, owner: str, attr: str):
+        is_plot = (owner in PLOT_MODULES) or (owner == "st" and attr in ST_CHARTS)
+        if not is_plot:
+            return
+        data = node.args[0] if node.args else None
+        for kw in node.keywords:
+            if kw.arg in ("data_frame", "data"):
+                data = kw.value
+        if data is None:
+            return
+        raw = (isinstance(data, ast.Name) and data.id in self._raw_frames) or \
+            (isinstance(data, ast.Call) and _contains_call(data, READ_FUNCS))
+        if raw:
+            self.add("plot-unaggregated", "warning", node,
+                     f"{owner}.{attr}() receives raw rows; aggregate or sample before plotting")
+
+
+def estimate_io(reads: List[Dict[str, Any]], s3_client=None) -> Dict[str, Any]:
+    """Estimate the reads (and bytes, when sizes are resolvable) done per rerun"""
+    uncached = [r for r in reads if not r["cached"]]
+    estimate = {
+        "reads_per_rerun": len(uncached),
+        "s3_reads_per_rerun": sum(1 for r in uncached if r["s3"]),
+        "reads_in_loops": sum(1 for r in uncached if r["in_loop"]),
+        "bytes_per_rerun": None,
+    }
+    if s3_client is None:
+        return estimate
+
+    total = 0
+    for read in uncached:
+        path = read["path"] or ""
+        if not path.startswith("s3://") or "{" in path:
+            continue
+        bucket, _, key = path[len("s3://"):].partition("/")
+        try:
+            read["bytes"] = s3_client.head_object(Bucket=bucket, Key=key)["ContentLength"]
+            total += read["bytes"]
+        except Exception as e:
+            read["bytes_error"] = str(e)
+    estimate["bytes_per_rerun"] = total
+    return estimate
+
+
+def lint_source(source: str, filename: str = "main.py", s3_client=None) -> Dict[str, Any]:
+    """Analyze report source code and return the machine-readable report"""
+    try:
+        tree = ast.parse(source, filename)
+    except SyntaxError as e:
+        return {
+            "file": filename,
+            "findings": [{"rule": "syntax-error", "severity": "error", "file": filename,
+                          "line": e.lineno or 0, "col": e.offset or 0, "message": str(e.msg)}],
+            "io": {"reads_per_rerun": 0, "s3_reads_per_rerun": 0, "reads_in_loops": 0,
+                   "bytes_per_rerun": None},
+            "reads": [],
+            "summary": {"error": 1, "warning": 0, "info": 0},
+        }
+
+    linter = ReportLinter(filename)
+    linter.visit(tree)
+    findings = sorted(linter.findings, key=lambda f: (f["line"], f["col"]))
+    return {
+        "file": filename,
+        "findings": findings,
+        "io": estimate_io(linter.reads, s3_client),
+        "reads": linter.reads,
+        "summary": {sev: sum(1 for f in findings if f["severity"] == sev) for sev in SEVERITIES},
+    }
+
+
+def should_fail(report: Dict[str, Any], fail_on: str) -> bool:
+    """True when any finding is at or above the ``fail_on`` severity"""
+    if fail_on == "never":
+        return False
+    threshold = SEVERITIES.index(fail_on)
+    return any(SEVERITIES.index(f["severity"]) >= threshold for f in report["findings"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Static performance linter for report scripts')
+    parser.add_argument('paths', nargs='+',
+                        help='Report scripts to analyze (local paths or s3://bucket/key)')
+    parser.add_argument('--output', '-o',
+                        help='Write the JSON report to this file')
+    parser.add_argument('--fail-on', choices=SEVERITIES + ['never'], default='error',
+                        help='Exit with status 1 when a finding has at least this severity')
+    parser.add_argument('--s3-sizes', action='store_true',
+                        help='Resolve object sizes in S3 to estimate bytes read per rerun')
+
+    args = parser.parse_args()
+
+    s3_client = None
+    if args.s3_sizes or any(p.startswith("s3://") for p in args.paths):
+        import boto3
+        s3_client = boto3.client('s3')
+
+    reports = []
+    for path in args.paths:
+        if path.startswith("s3://"):
+            bucket, _, key = path[len("s3://"):].partition("/")
+            source = s3_client.get_object(Bucket=bucket, Key=key)['Body'].read().decode('utf-8')
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                source = f.read()
+        reports.append(lint_source(source, path, s3_client if args.s3_sizes else None))
+
+    for report in reports:
+        for finding in report["findings"]:
+            print(f"{finding['file']}:{finding['line']}:{finding['col']}: "
+                  f"{finding['severity']} [{finding['rule']}] {finding['message']}")
+        io = report["io"]
+        size = f", ~{io['bytes_per_rerun'] / (1024 * 1024):.1f} MB" if io["bytes_per_rerun"] else ""
+        print(f"📊 {report['file']}: {io['reads_per_rerun']} uncached reads per rerun{size}")
+
+    result = {"reports": reports, "fail_on": args.fail_on,
+              "failed": any(should_fail(r, args.fail_on) for r in reports)}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+    if result["failed"]:
+        print(f"❌ Findings at or above '{args.fail_on}' - upload blocked")
+        sys.exit(1)
+    print("✅ No blocking findings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Report Tracer
+Optional profiling of reports executed by the Central de Relatórios:
+- Times every proxied ``st.*`` call and every top-level statement of the script
+- Records payload sizes for charts and dataframes handed to Streamlit
+- Builds a per-report profile (slowest calls, bytes sent, data-load vs render split)
+
+Tracing is enabled per request with ``?trace=<token>``, where the token is the
+value of ``REPORT_TRACE_TOKEN`` handed to report authors; the profile quotes the
+report source, so without that variable tracing is off. The profile is shown
+below the report, with a JSON export for offline analysis.
+"""
+
+import ast
+import hmac
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+TRACE_QUERY_PARAM = "trace"
+TRACE_DIR_ENV = "REPORT_TRACE_DIR"
+TRACE_TOKEN_ENV = "REPORT_TRACE_TOKEN"
+TOP_N = 10
+
+
+def is_trace_requested(query_params) -> bool:
+    """Check whether the current request asked for a traced run with the author token"""
+    token = os.environ.get(TRACE_TOKEN_ENV, "")
+    value = query_params.get(TRACE_QUERY_PARAM)
+    if not token or not value:
+        return False
+    return hmac.compare_digest(str(value).encode("utf-8"), token.encode("utf-8"))
+
+
+def estimate_payload_bytes(value: Any) -> int:
+    """Estimate the bytes Streamlit will serialize for a chart or dataframe argument"""
+    try:
+        # pandas DataFrame / Series
+        if hasattr(value, "memory_usage") and hasattr(value, "columns"):
+            return int(value.memory_usage(index=True, deep=True).sum())
+        if hasattr(value, "memory_usage") and hasattr(value, "dtype"):
+            return int(value.memory_usage(index=True, deep=True))
+        # numpy arrays
+        if hasattr(value, "nbytes") and hasattr(value, "shape"):
+            return int(value.nbytes)
+        # Plotly figures
+        if hasattr(value, "to_plotly_json") and hasattr(value, "to_json"):
+            return len(value.to_json())
+        # Altair charts and pydeck decks
+        if hasattr(value, "to_json") and (hasattr(value, "to_dict") or hasattr(value, "layers")):
+            return len(value.to_json())
+    except Exception:
+        return 0
+    return 0
+
+
+class ReportTracer:
+    """Collects call and statement timings for one report execution"""
+
+    def __init__(self, report_id: str, filename: str = "<report>"):
+        self.report_id = str(report_id)
+        self.filename = filename
+        self.calls: List[Dict[str, Any]] = []
+        self.statements: List[Dict[str, Any]] = []
+        self.phases: Dict[str, float] = {}
+        self.started_at = time.time()
+        self.wall_seconds = 0.0
+        self._st_seconds = 0.0
+        self._depth = 0
+
+    def record_phase(self, name: str, seconds: float):
+        """Record the duration of a loader phase (download, compile, ...)"""
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def wrap_call(self, name: str, func):
+        """Return a callable that times ``func`` and records its payload size"""
+        return _TracedCallable(self, name, func)
+
+    def _record_call(self, name: str, func, args, kwargs):
+        # Nested Streamlit calls are already covered by the outer call
+        if self._depth:
+            return func(*args, **kwargs)
+
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._depth -= 1
+            self._st_seconds += elapsed
+            payload = sum(estimate_payload_bytes(a) for a in args)
+            payload += sum(estimate_payload_bytes(v) for v in kwargs.values())
+            self.calls.append({
+                "name": f"st.{name}",
+                "lineno": self._caller_lineno(),
+                "seconds": elapsed,
+                "payload_bytes": payload,
+            })
+
+    def _caller_lineno(self) -> Optional[int]:
+        """Find the line of the report script that issued the current call"""
+        frame = sys._getframe(1)
+        while frame is not None:
+            if frame.f_code.co_filename == self.filename:
+                return frame.f_lineno
+            frame = frame.f_back
+        return None
+
+    def run(self, code: str, exec_globals: Dict[str, Any]):
+        """Execute ``code`` statement by statement, timing each one"""
+        start = time.perf_counter()
+        try:
+            tree = ast.parse(code, self.filename)
+            has_future = any(
+                isinstance(node, ast.ImportFrom) and node.module == "__future__"
+                for node in tree.body
+            )
+            if has_future:
+                # __future__ imports must stay at the top of a single module
+                self._run_statement(tree, tree.body[0].lineno if tree.body else 1,
+                                    "<module>", exec_globals)
+                return
+
+            lines = code.splitlines()
+            for node in tree.body:
+                module = ast.Module(body=[node], type_ignores=[])
+                source = lines[node.lineno - 1].strip() if node.lineno <= len(lines) else ""
+                self._run_statement(module, node.lineno, source, exec_globals)
+        finally:
+            self.wall_seconds = time.perf_counter() - start
+
+    def _run_statement(self, module, lineno: int, source: str, exec_globals: Dict[str, Any]):
+        compiled = compile(module, self.filename, "exec")
+        st_before = self._st_seconds
+        start = time.perf_counter()
+        try:
+            exec(compiled, exec_globals)
+        finally:
+            elapsed = time.perf_counter() - start
+            render = self._st_seconds - st_before
+            self.statements.append({
+                "lineno": lineno,
+                "source": source[:120],
+                "seconds": elapsed,
+                "render_seconds": render,
+                "data_seconds": max(elapsed - render, 0.0),
+            })
+
+    def profile(self) -> Dict[str, Any]:
+        """Build the per-report profile"""
+        by_name: Dict[str, Dict[str, Any]] = {}
+        for call in self.calls:
+            entry = by_name.setdefault(call["name"], {"name": call["name"], "count": 0,
+                                                      "seconds": 0.0, "payload_bytes": 0})
+            entry["count"] += 1
+            entry["seconds"] += call["seconds"]
+            entry["payload_bytes"] += call["payload_bytes"]
+
+        render_seconds = self._st_seconds
+        return {
+            "report_id": self.report_id,
+            "started_at": self.started_at,
+            "wall_seconds": self.wall_seconds,
+            "render_seconds": render_seconds,
+            "data_seconds": max(self.wall_seconds - render_seconds, 0.0),
+            "bytes_sent": sum(call["payload_bytes"] for call in self.calls),
+            "call_count": len(self.calls),
+            "phases": dict(self.phases),
+            "slowest_calls": sorted(self.calls, key=lambda c: c["seconds"], reverse=True)[:TOP_N],
+            "slowest_statements": sorted(self.statements, key=lambda s: s["seconds"], reverse=True)[:TOP_N],
+            "calls_by_name": sorted(by_name.values(), key=lambda e: e["seconds"], reverse=True),
+            "statements": self.statements,
+            "calls": self.calls,
+        }
+
+    def export_json(self) -> str:
+        """Serialize the profile for offline analysis"""
+        return json.dumps(self.profile(), indent=2, default=str)
+
+    def save(self, directory: Optional[str] = None) -> Optional[str]:
+        """Write the profile to ``REPORT_TRACE_DIR`` if configured"""
+        directory = directory or os.environ.get(TRACE_DIR_ENV)
+        if not directory:
+            return None
+        try:
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"trace_{self.report_id}_{int(self.started_at)}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.export_json())
+            return path
+        except Exception as e:
+            print(f"Error saving trace for report {self.report_id}: {e}")
+            return None
+
+
+class _TracedCallable:
+    """Times calls to a Streamlit callable; other attributes (``st.cache_data.clear``)
+    are forwarded so tracing never changes report behavior"""
+
+    def __init__(self, tracer: ReportTracer, name: str, func):
+        self._tracer = tracer
+        self._name = name
+        self.__wrapped__ = func
+
+    def __call__(self, *args, **kwargs):
+        return self._tracer._record_call(self._name, self.__wrapped__, args, kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.__wrapped__, name)
+
+    def __repr__(self):
+        return repr(self.__wrapped__)
+
+
+class StreamlitWrapper:
+    """Proxy for ``st`` handed to reports; optionally traces every call"""
+
+    def __init__(self, original_st, tracer: Optional[ReportTracer] = None):
+        self._st = original_st
+        self._tracer = tracer
+
+    def __getattr__(self, name):
+        if name == 'set_page_config':
+            # Return a no-op function for set_page_config
+            return lambda *args, **kwargs: None
+        attr = getattr(self._st, name)
+        if self._tracer is None or not callable(attr):
+            return attr
+        return self._tracer.wrap_call(name, attr)
+
+
+def render_profile(st, tracer: ReportTracer):
+    """Render the profile below the report with a JSON export"""
+    profile = tracer.profile()
+    saved_path = tracer.save()
+
+    with st.expander("⏱️ Perfil de execução do relatório", expanded=False):
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Tempo total", f"{profile['wall_seconds']:.2f}s")
+        with col2:
+            st.metric("Dados / cálculo", f"{profile['data_seconds']:.2f}s")
+        with col3:
+            st.metric("Renderização", f"{profile['render_seconds']:.2f}s")
+        with col4:
+            st.metric("Bytes enviados", f"{profile['bytes_sent'] / 1024:.1f} KB")
+
+        if profile["phases"]:
+            st.markdown("**Etapas do carregamento**")
+            st.dataframe([{"etapa": k, "seconds": round(v, 4)} for k, v in profile["phases"].items()])
+
+        st.markdown("**Chamadas mais lentas**")
+        st.dataframe(profile["slowest_calls"])
+
+        st.markdown("**Instruções mais lentas**")
+        st.dataframe(profile["slowest_statements"])
+
+        st.markdown("**Chamadas por função**")
+        st.dataframe(profile["calls_by_name"])
+
+        st.download_button(
+            "📥 Exportar perfil (JSON)",
+            data=tracer.export_json(),
+            file_name=f"trace_{profile['report_id']}.json",
+            mime="application/json",
+        )
+        if saved_path:
+            st.caption(f"Perfil salvo em {saved_path}")
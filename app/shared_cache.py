@@ -0,0 +1,364 @@
+"""
+Shared Cache
+Cache tier shared by all replicas, so new pods start warm and pods agree on
+what is current:
+- Pluggable backends selected by ``REPORT_CACHE_URL``:
+  ``memory://`` (single process, default), ``file:///path`` (all processes on a
+  node) or ``redis://host:6379/0`` (any Redis-compatible server, all replicas)
+- An in-process layer in front of the backend for hot entries
+- Invalidation messages broadcast to every subscriber when a report's
+  ``updated_at`` (DynamoDB) or ETag (S3) changes
+
+Holds catalog snapshots and downloaded report artifacts.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+CACHE_URL = os.environ.get("REPORT_CACHE_URL", "memory://")
+CATALOG_TTL = int(os.environ.get("REPORT_CATALOG_TTL", "60"))
+ARTIFACT_TTL = int(os.environ.get("REPORT_ARTIFACT_TTL", "3600"))
+KEY_PREFIX = "report-app:"
+CHANNEL = f"{KEY_PREFIX}invalidate"
+
+CATALOG_KEY = "catalog"
+
+
+def artifact_key(report_id) -> str:
+    return f"artifact:{report_id}"
+
+
+class CacheBackend:
+    """Interface of a shared cache backend"""
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def set_if_absent(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        """Atomically set ``key`` unless it exists; True when this call set it"""
+        raise NotImplementedError
+
+    def publish(self, message: Dict[str, Any]):
+        raise NotImplementedError
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """Process-local backend (single replica, development)"""
+
+    def __init__(self):
+        self._data: Dict[str, Any] = {}
+        self._subscribers: List[Callable] = []
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def set_if_absent(self, key, value, ttl=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and (entry[1] is None or entry[1] >= time.time()):
+                return False
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+            return True
+
+    def publish(self, message):
+        for callback in list(self._subscribers):
+            callback(message)
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+
+class DiskBackend(CacheBackend):
+    """Backend shared by the processes of one node through a directory"""
+
+    EVENTS_FILE = "events.log"
+    MAX_EVENTS_BYTES = 1024 * 1024
+    POLL_SECONDS = 1.0
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._events_path = os.path.join(directory, self.EVENTS_FILE)
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in key)
+        return os.path.join(self.directory, f"{safe}.cache")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                header = f.readline()
+                expires_at = float(header) if header.strip() else None
+                if expires_at is not None and expires_at < time.time():
+                    return None
+                return f.read()
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def set(self, key, value, ttl=None):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        header = f"{time.time() + ttl}\n" if ttl else "\n"
+        with open(tmp_path, "wb") as f:
+            f.write(header.encode("ascii"))
+            f.write(value)
+        os.replace(tmp_path, path)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def set_if_absent(self, key, value, ttl=None):
+        path = self._path(key)
+        header = f"{time.time() + ttl}\n" if ttl else "\n"
+        for _ in range(2):
+            try:
+                # O_EXCL: only one process on the node creates the file
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            except FileExistsError:
+                if self.get(key) is not None:
+                    return False
+                # Expired: remove it and race for it once more
+                self.delete(key)
+                continue
+            with os.fdopen(fd, "wb") as f:
+                f.write(header.encode("ascii"))
+                f.write(value)
+            return True
+        return False
+
+    def publish(self, message):
+        line = json.dumps(message) + "\n"
+        with self._lock:
+            if os.path.exists(self._events_path) and os.path.getsize(self._events_path) > self.MAX_EVENTS_BYTES:
+                os.remove(self._events_path)
+            with open(self._events_path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def subscribe(self, callback):
+        def poll():
+            offset = os.path.getsize(self._events_path) if os.path.exists(self._events_path) else 0
+            while True:
+                time.sleep(self.POLL_SECONDS)
+                try:
+                    size = os.path.getsize(self._events_path)
+                except FileNotFoundError:
+                    offset = 0
+                    continue
+                if size < offset:
+                    # The log was rotated
+                    offset = 0
+                if size == offset:
+                    continue
+                with open(self._events_path, "r", encoding="utf-8") as f:
+                    f.seek(offset)
+                    for line in f:
+                        if line.endswith("\n"):
+                            try:
+                                callback(json.loads(line))
+                            except Exception as e:
+                                print(f"Error handling cache invalidation: {e}")
+                    offset = f.tell()
+
+        threading.Thread(target=poll, name="shared-cache-events", daemon=True).start()
+
+
+class RedisBackend(CacheBackend):
+    """Backend shared by every replica through a Redis-compatible server"""
+
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self._client.get(KEY_PREFIX + key)
+
+    def set(self, key, value, ttl=None):
+        self._client.set(KEY_PREFIX + key, value, ex=int(ttl) if ttl else None)
+
+    def delete(self, key):
+        self._client.delete(KEY_PREFIX + key)
+
+    def set_if_absent(self, key, value, ttl=None):
+        return bool(self._client.set(KEY_PREFIX + key, value, ex=int(ttl) if ttl else None, nx=True))
+
+    def publish(self, message):
+        self._client.publish(CHANNEL, json.dumps(message))
+
+    def subscribe(self, callback):
+        def listen():
+            while True:
+                try:
+                    pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(CHANNEL)
+                    for item in pubsub.listen():
+                        callback(json.loads(item["data"]))
+                except Exception as e:
+                    print(f"Shared cache subscription lost, reconnecting: {e}")
+                    time.sleep(5)
+
+        threading.Thread(target=listen, name="shared-cache-events", daemon=True).start()
+
+
+def backend_from_url(url: str) -> CacheBackend:
+    """Build the backend configured by ``REPORT_CACHE_URL``"""
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    if url.startswith("file://"):
+        return DiskBackend(url[len("file://"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"REPORT_CACHE_URL não suportada: {url}")
+
+
+class SharedCache:
+    """In-process layer over a shared backend, kept coherent by invalidation messages"""
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.instance_id = uuid.uuid4().hex
+        self._local: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.stats = {"local_hits": 0, "shared_hits": 0, "misses": 0, "invalidations": 0}
+        backend.subscribe(self._on_message)
+
+    def _on_message(self, message: Dict[str, Any]):
+        with self._lock:
+            for key in message.get("keys", []):
+                self._local.pop(key, None)
+            self.stats["invalidations"] += 1
+
+    def get_local(self, key: str):
+        """Hot object cached in this process (e.g. a parsed bundle)"""
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._local[key]
+                return None
+            self.stats["local_hits"] += 1
+            return value
+
+    def set_local(self, key: str, value, ttl: Optional[float] = None):
+        with self._lock:
+            self._local[key] = (value, time.time() + ttl if ttl else None)
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            print(f"Shared cache unavailable: {e}")
+            value = None
+        with self._lock:
+            self.stats["shared_hits" if value is not None else "misses"] += 1
+        return value
+
+    def set_bytes(self, key: str, value: bytes, ttl: Optional[float] = None):
+        try:
+            self.backend.set(key, value, ttl)
+        except Exception as e:
+            print(f"Shared cache unavailable: {e}")
+
+    def set_if_absent(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        """Atomic claim on ``key`` (leases); False when taken or the backend is down"""
+        try:
+            return self.backend.set_if_absent(key, value, ttl)
+        except Exception as e:
+            print(f"Shared cache unavailable: {e}")
+            return False
+
+    def get_json(self, key: str):
+        value = self.get_bytes(key)
+        return json.loads(value) if value is not None else None
+
+    def set_json(self, key: str, value, ttl: Optional[float] = None):
+        self.set_bytes(key, json.dumps(value, default=str).encode("utf-8"), ttl)
+
+    def invalidate(self, keys: List[str], reason: str = ""):
+        """Drop ``keys`` everywhere and tell every other process to do the same"""
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+        try:
+            for key in keys:
+                self.backend.delete(key)
+            self.backend.publish({"keys": keys, "reason": reason, "source": self.instance_id})
+        except Exception as e:
+            print(f"Shared cache unavailable: {e}")
+
+    # Catalog ----------------------------------------------------------------
+
+    def get_catalog(self) -> Optional[Dict[str, Any]]:
+        """Current catalog snapshot, if one was published recently"""
+        catalog = self.get_local(CATALOG_KEY)
+        if catalog is None:
+            snapshot = self.get_json(CATALOG_KEY)
+            if snapshot is None or snapshot["published_at"] + CATALOG_TTL < time.time():
+                return None
+            catalog = snapshot["reports"]
+            self.set_local(CATALOG_KEY, catalog, snapshot["published_at"] + CATALOG_TTL - time.time())
+        return catalog
+
+    def publish_catalog(self, reports_data: Dict[str, Any]):
+        """Publish a fresh catalog and invalidate artifacts of updated reports"""
+        previous = self.get_json(f"{CATALOG_KEY}:last") or {}
+        changed = [
+            report_id for report_id, report in reports_data.items()
+            if report_id in previous and previous[report_id] != report.get("updated_at")
+        ]
+        snapshot = {"published_at": time.time(), "reports": reports_data}
+        self.set_json(CATALOG_KEY, snapshot, CATALOG_TTL)
+        self.set_json(f"{CATALOG_KEY}:last",
+                      {report_id: report.get("updated_at") for report_id, report in reports_data.items()})
+        self.set_local(CATALOG_KEY, reports_data, CATALOG_TTL)
+        if changed:
+            self.invalidate([artifact_key(report_id) for report_id in changed], "updated_at")
+
+
+def _create_cache() -> SharedCache:
+    try:
+        return SharedCache(backend_from_url(CACHE_URL))
+    except Exception as e:
+        print(f"Error initializing shared cache '{CACHE_URL}', using memory: {e}")
+        return SharedCache(MemoryBackend())
+
+
+# Process-wide instance
+cache = _create_cache()
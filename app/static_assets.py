@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Static Asset Pipeline
+Builds the app stylesheet once instead of re-sending it on every rerun:
+- Minifies and fingerprints CSS (app ``style.css`` + ``navbar.css`` and the
+  per-report ``custom_css`` from the report TOML)
+- Writes the results to ``static/`` (served by Streamlit's static file serving
+  at ``app/static/<file>``) and keeps them cached in memory
+- Vendors the navbar logo so it no longer comes from an external CDN
+- Serves fingerprinted files with long-lived ``Cache-Control`` headers
+
+Each rerun then emits a small ``<link>`` tag instead of the stylesheet text.
+Run ``python app/static_assets.py build`` at image build time; the app also
+builds lazily on startup when the manifest is missing.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import urllib.request
+from typing import Dict, Optional
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(APP_DIR, "static")
+MANIFEST_PATH = os.path.join(STATIC_DIR, "manifest.json")
+STATIC_URL_PREFIX = "app/static/"
+
+APP_CSS_SOURCES = ["style.css", "navbar.css"]
+LOGO_URL = "https://d28lvm9jkyfotx.cloudfront.net/logo.png"
+
+FINGERPRINT_RE = re.compile(r"\.[0-9a-f]{12}\.(css|png)$")
+CONTENT_TYPES = {".css": "text/css", ".png": "image/png"}
+LONG_LIVED_CACHE = "public, max-age=31536000, immutable"
+# Streamlit releases whose AppStaticFileHandler.set_extra_headers(self, path) we patch
+SUPPORTED_STREAMLIT = ((1, 18), (2, 0))
+_CSS_STRING = re.compile(r"""("(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')""")
+
+_lock = threading.Lock()
+_manifest: Optional[Dict[str, str]] = None
+_published: Dict[str, str] = {}
+_inline: Dict[str, str] = {}
+_headers_installed: Optional[bool] = None
+
+
+def _minify_code(css: str) -> str:
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r"([{;])\s*([\w-]+)\s*:\s*", r"\1\2:", css)
+    return css.replace(";}", "}")
+
+
+def minify_css(css: str) -> str:
+    """Strip comments and redundant whitespace from a stylesheet, leaving strings intact"""
+    # One pass over strings and comments, so neither can hide the other
+    css = re.sub(_CSS_STRING.pattern + r"|/\*.*?\*/", lambda m: m.group(1) or "", css, flags=re.S)
+    parts = _CSS_STRING.split(css)
+    for i in range(0, len(parts), 2):
+        parts[i] = _minify_code(parts[i])
+    return "".join(parts).strip()
+
+
+def fingerprint(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()[:12]
+
+
+def _write_asset(name: str, ext: str, content: bytes) -> str:
+    """Write ``content`` as ``<name>.<hash><ext>`` once and return the file name"""
+    filename = f"{name}.{fingerprint(content)}{ext}"
+    path = os.path.join(STATIC_DIR, filename)
+    if not os.path.exists(path):
+        os.makedirs(STATIC_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    return filename
+
+
+def build(fetch_logo: bool = True) -> Dict[str, str]:
+    """Minify and fingerprint the app assets and write the manifest"""
+    css = []
+    for source in APP_CSS_SOURCES:
+        with open(os.path.join(APP_DIR, source), "r", encoding="utf-8") as f:
+            css.append(f.read())
+    app_css = minify_css("\n".join(css)).encode("utf-8")
+
+    manifest = {"app.css": _write_asset("app", ".css", app_css)}
+
+    if fetch_logo:
+        try:
+            with urllib.request.urlopen(LOGO_URL, timeout=10) as response:
+                manifest["logo.png"] = _write_asset("logo", ".png", response.read())
+        except Exception as e:
+            print(f"Logo not vendored, falling back to CDN: {e}")
+
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    global _manifest
+    _manifest = manifest
+    return manifest
+
+
+def manifest() -> Dict[str, str]:
+    """Logical name -> fingerprinted file, loaded (or built) once per process"""
+    global _manifest
+    with _lock:
+        if _manifest is None:
+            try:
+                with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+                    _manifest = json.load(f)
+            except (FileNotFoundError, ValueError):
+                _manifest = build(fetch_logo=False)
+        return _manifest
+
+
+def asset_url(filename: str) -> str:
+    """Relative URL of a static file (works under ``--server.baseUrlPath``)"""
+    return f"{STATIC_URL_PREFIX}{filename}"
+
+
+def logo_url() -> str:
+    """Vendored logo when available, CDN otherwise"""
+    try:
+        filename = manifest().get("logo.png")
+    except Exception:
+        filename = None
+    return asset_url(filename) if filename else LOGO_URL
+
+
+def publish_css(css: str, name: str) -> str:
+    """Minify and fingerprint runtime CSS (e.g. per-report ``custom_css``)"""
+    key = hashlib.sha256(css.encode("utf-8")).hexdigest()
+    with _lock:
+        filename = _published.get(key)
+        if filename is None:
+            safe_name = re.sub(r"[^A-Za-z0-9_-]+", "_", name)
+            filename = _write_asset(safe_name, ".css", minify_css(css).encode("utf-8"))
+            _published[key] = filename
+    return filename
+
+
+def _read_static(filename: str) -> str:
+    with open(os.path.join(STATIC_DIR, filename), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def stylesheet_html(filename: str) -> str:
+    """``<link>`` to a fingerprinted stylesheet, or inline CSS if it can't be served"""
+    if install_cache_headers():
+        return f'<link rel="stylesheet" href="{asset_url(filename)}">'
+    with _lock:
+        css = _inline.get(filename)
+        if css is None:
+            css = _inline[filename] = _read_static(filename)
+    return f"<style>{css}</style>"
+
+
+def app_stylesheet_html() -> str:
+    return stylesheet_html(manifest()["app.css"])
+
+
+def install_cache_headers() -> bool:
+    """Serve fingerprinted files as CSS/PNG with long-lived cache headers
+
+    Streamlit's static handler sends unknown extensions (including ``.css``) as
+    ``text/plain`` with ``nosniff``, which browsers refuse as a stylesheet, and
+    sets no cache lifetime. Fingerprinted names never change content, so they
+    are safe to cache forever.
+    """
+    global _headers_installed
+    if _headers_installed is not None:
+        return _headers_installed
+    _headers_installed = False
+    try:
+        import streamlit
+        from streamlit import config
+        from streamlit.web.server.app_static_file_handler import AppStaticFileHandler
+
+        if not config.get_option("server.enableStaticServing"):
+            return False
+        version = tuple(int(p) for p in re.findall(r"\d+", streamlit.__version__)[:2])
+        if not SUPPORTED_STREAMLIT[0] <= version < SUPPORTED_STREAMLIT[1] \
+                or "set_extra_headers" not in AppStaticFileHandler.__dict__:
+            print(f"Static asset headers not supported on Streamlit {streamlit.__version__}, inlining CSS")
+            return False
+
+        original = AppStaticFileHandler.set_extra_headers
+
+        def set_extra_headers(self, path):
+            original(self, path)
+            if FINGERPRINT_RE.search(path):
+                ext = os.path.splitext(path)[1]
+                self.set_header("Content-Type", CONTENT_TYPES[ext])
+                self.set_header("Cache-Control", LONG_LIVED_CACHE)
+
+        AppStaticFileHandler.set_extra_headers = set_extra_headers
+        _headers_installed = True
+    except Exception as e:
+        print(f"Static asset headers not installed, inlining CSS: {e}")
+    return _headers_installed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build minified, fingerprinted static assets')
+    parser.add_argument('command', choices=['build'],
+                        help='Pipeline step to run')
+    parser.add_argument('--no-logo', action='store_true',
+                        help='Do not download the navbar logo')
+
+    args = parser.parse_args()
+
+    manifest_data = build(fetch_logo=not args.no_logo)
+    for name, filename in manifest_data.items():
+        size = os.path.getsize(os.path.join(STATIC_DIR, filename))
+        print(f"✅ {name} -> static/{filename} ({size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Streaming Reader
+Bounded-memory reading of large CSV/Parquet files for report code:
+- Iterates S3 (or local) objects in chunks / Parquet record batches
+- Incremental aggregations: Count, Sum, Mean, Histogram, TopK, GroupSum
+- Placeholder metrics and charts updated while chunks arrive
+
+Reports receive it as ``stream``::
+
+    results = stream.aggregate(
+        stream.parquet("s3://dataiesb-reports/42/matriculas.parquet", columns=["uf", "valor"]),
+        linhas=stream.Count(), total=stream.Sum("valor"),
+        faixas=stream.Histogram("valor", range=(0, 5000), bins=20),
+        top_ufs=stream.TopK("uf", k=10),
+        render=lambda r, box: box.bar_chart(r["top_ufs"]),
+    )
+"""
+
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+DEFAULT_CHUNK_ROWS = 100_000
+DEFAULT_RENDER_EVERY = 1.0
+
+
+class Aggregator:
+    """Incremental aggregation over DataFrame chunks"""
+
+    def update(self, chunk):
+        raise NotImplementedError
+
+    def result(self):
+        raise NotImplementedError
+
+
+class Count(Aggregator):
+    def __init__(self):
+        self.count = 0
+
+    def update(self, chunk):
+        self.count += len(chunk)
+
+    def result(self):
+        return self.count
+
+
+class Sum(Aggregator):
+    def __init__(self, column: str):
+        self.column = column
+        self.total = 0
+
+    def update(self, chunk):
+        self.total += chunk[self.column].sum()
+
+    def result(self):
+        return self.total
+
+
+class Mean(Aggregator):
+    def __init__(self, column: str):
+        self.column = column
+        self.total = 0.0
+        self.count = 0
+
+    def update(self, chunk):
+        values = chunk[self.column]
+        self.total += values.sum()
+        self.count += values.count()
+
+    def result(self):
+        return self.total / self.count if self.count else None
+
+
+class Histogram(Aggregator):
+    """Counts per fixed bin over ``range``, known up front to keep bins stable
+
+    Values outside the range are counted in ``< min`` / ``> max`` rows instead
+    of being dropped.
+    """
+
+    def __init__(self, column: str, range: Tuple[float, float], bins: int = 20):
+        import numpy as np
+
+        self.column = column
+        self.edges = np.linspace(range[0], range[1], bins + 1)
+        self.counts = np.zeros(bins, dtype="int64")
+        self.underflow = 0
+        self.overflow = 0
+
+    def update(self, chunk):
+        import numpy as np
+
+        values = chunk[self.column].dropna().to_numpy()
+        counts, _ = np.histogram(values, bins=self.edges)
+        self.counts += counts
+        self.underflow += int((values < self.edges[0]).sum())
+        self.overflow += int((values > self.edges[-1]).sum())
+
+    def result(self):
+        import pandas as pd
+
+        labels = [f"{self.edges[i]:g}–{self.edges[i + 1]:g}" for i in range(len(self.counts))]
+        counts = list(self.counts)
+        if self.underflow:
+            labels, counts = [f"< {self.edges[0]:g}"] + labels, [self.underflow] + counts
+        if self.overflow:
+            labels, counts = labels + [f"> {self.edges[-1]:g}"], counts + [self.overflow]
+        return pd.DataFrame({"faixa": labels, "contagem": counts}).set_index("faixa")
+
+
+class TopK(Aggregator):
+    """Most frequent values with bounded memory (Space-Saving, weighted per chunk)
+
+    At most ``capacity`` values are tracked. When the table is full, a new value
+    replaces the one with the smallest count and inherits that count, so counts
+    are approximate (over-estimated by at most that minimum); with fewer distinct
+    values than ``capacity`` they are exact.
+    """
+
+    def __init__(self, column: str, k: int = 10, capacity: Optional[int] = None):
+        self.column = column
+        self.k = k
+        self.capacity = capacity or max(k * 100, 1000)
+        self.counts: Dict[Any, int] = {}
+
+    def update(self, chunk):
+        import heapq
+
+        heap = None
+        for value, count in chunk[self.column].value_counts().items():
+            count = int(count)
+            if value in self.counts:
+                self.counts[value] += count
+            elif len(self.counts) < self.capacity:
+                self.counts[value] = count
+            else:
+                if heap is None:
+                    heap = [(c, i, v) for i, (v, c) in enumerate(self.counts.items())]
+                    heapq.heapify(heap)
+                # Refresh stale entries (count grew or value evicted since pushed)
+                while heap[0][0] != self.counts.get(heap[0][2]):
+                    _, i, stale = heapq.heappop(heap)
+                    if stale in self.counts:
+                        heapq.heappush(heap, (self.counts[stale], i, stale))
+                minimum, _, evicted = heapq.heappop(heap)
+                del self.counts[evicted]
+                self.counts[value] = minimum + count
+                heapq.heappush(heap, (minimum + count, id(value), value))
+
+    def result(self):
+        import pandas as pd
+
+        top = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:self.k]
+        return pd.Series(dict(top), name="contagem", dtype="int64")
+
+
+class GroupSum(Aggregator):
+    """Sum of ``column`` per group; memory grows with the number of groups"""
+
+    def __init__(self, by, column: str):
+        self.by = by
+        self.column = column
+        self.totals = None
+
+    def update(self, chunk):
+        partial = chunk.groupby(self.by)[self.column].sum()
+        self.totals = partial if self.totals is None else self.totals.add(partial, fill_value=0)
+
+    def result(self):
+        return self.totals
+
+
+class StreamReader:
+    """Chunked readers and progressive aggregation bound to a report's ``st``"""
+
+    Count = Count
+    Sum = Sum
+    Mean = Mean
+    Histogram = Histogram
+    TopK = TopK
+    GroupSum = GroupSum
+
+    def __init__(self, st, fs=None):
+        self._st = st
+        self._fs = fs
+
+    def _open(self, path: str):
+        if path.startswith("s3://"):
+            if self._fs is None:
+                import s3fs
+                self._fs = s3fs.S3FileSystem()
+            return self._fs.open(path, "rb"), self._fs.size(path)
+        import os
+        return open(path, "rb"), os.path.getsize(path)
+
+    def csv(self, path: str, chunksize: int = DEFAULT_CHUNK_ROWS, **kwargs) -> Iterator:
+        """Yield DataFrame chunks of a CSV; ``progress`` is the fraction of bytes read"""
+        import pandas as pd
+
+        handle, size = self._open(path)
+        with handle:
+            for chunk in pd.read_csv(handle, chunksize=chunksize, **kwargs):
+                chunk.attrs["progress"] = min(handle.tell() / size, 1.0) if size else None
+                yield chunk
+
+    def parquet(self, path: str, columns=None, batch_size: int = DEFAULT_CHUNK_ROWS) -> Iterator:
+        """Yield DataFrame chunks of a Parquet file, one record batch at a time"""
+        import pyarrow.parquet as pq
+
+        handle, _ = self._open(path)
+        with handle:
+            parquet_file = pq.ParquetFile(handle)
+            total = parquet_file.metadata.num_rows
+            read = 0
+            for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+                chunk = batch.to_pandas()
+                read += len(chunk)
+                chunk.attrs["progress"] = read / total if total else None
+                yield chunk
+
+    def aggregate(self, chunks: Iterable, render: Optional[Callable] = None,
+                  every: float = DEFAULT_RENDER_EVERY, **aggregators: Aggregator) -> Dict[str, Any]:
+        """Feed chunks to the aggregators, refreshing placeholders as they arrive
+
+        ``render(results, box)`` draws the partial results into ``box``, a
+        container replaced in place on every refresh; it runs at most every ``every`` seconds and
+        once more at the end. Returns the final results.
+        """
+        progress = self._st.progress(0.0, text="Carregando dados...")
+        box = self._st.empty() if render is not None else None
+        rows = 0
+        last_render = 0.0
+        start = time.perf_counter()
+
+        for chunk in chunks:
+            for aggregator in aggregators.values():
+                aggregator.update(chunk)
+            rows += len(chunk)
+            fraction = chunk.attrs.get("progress")
+
+            now = time.perf_counter()
+            if now - last_render >= every:
+                text = f"{rows:,} linhas processadas"
+                progress.progress(min(fraction, 1.0) if fraction is not None else 0.0, text=text)
+                if render is not None:
+                    render(self._results(aggregators), box.container())
+                last_render = now
+
+        results = self._results(aggregators)
+        progress.progress(1.0, text=f"{rows:,} linhas em {time.perf_counter() - start:.1f}s")
+        if render is not None:
+            render(results, box.container())
+        return results
+
+    @staticmethod
+    def _results(aggregators: Dict[str, Aggregator]) -> Dict[str, Any]:
+        return {name: aggregator.result() for name, aggregator in aggregators.items()}
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+Multi-Process Supervisor
+Runs several Streamlit workers inside one pod so Python work can use more than
+one core:
+- Spawns ``REPORT_WORKERS`` ``streamlit run app/app.py`` processes on local ports
+- Proxies HTTP and the ``/_stcore/stream`` websocket, keeping every browser on
+  the worker that holds its session (``report_worker`` cookie)
+- Health-checks workers, restarts dead ones and recycles (drain, then restart)
+  workers whose RSS exceeds ``REPORT_WORKER_MAX_RSS_MB``
+- Aggregates worker metrics at ``/_supervisor/metrics`` and ``/_supervisor/status``
+
+With ``REPORT_WORKERS=1`` (default) it simply execs Streamlit on ``PORT``.
+
+    python app/supervisor.py -- --server.baseUrlPath=/report --server.enableCORS=false \
+        --server.enableStaticServing=true
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+WORKER_COOKIE = "report_worker"
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te",
+    "trailers", "transfer-encoding", "upgrade", "content-length",
+}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+WORKERS = _env_int("REPORT_WORKERS", 1)
+PORT = _env_int("PORT", 8501)
+BASE_WORKER_PORT = _env_int("REPORT_WORKER_BASE_PORT", 8600)
+MAX_RSS_MB = _env_int("REPORT_WORKER_MAX_RSS_MB", 0)
+HEALTH_INTERVAL = _env_int("REPORT_HEALTH_INTERVAL", 10)
+HEALTH_FAILURES = _env_int("REPORT_HEALTH_FAILURES", 3)
+DRAIN_TIMEOUT = _env_int("REPORT_DRAIN_TIMEOUT", 300)
+
+
+def read_rss_bytes(pid: int) -> Optional[int]:
+    """Resident set size of ``pid`` (Linux ``/proc``)"""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        return None
+    return None
+
+
+class Worker:
+    """One supervised Streamlit process"""
+
+    def __init__(self, index: int, port: int, streamlit_args: List[str]):
+        self.index = index
+        self.port = port
+        self.streamlit_args = streamlit_args
+        self.process: Optional[subprocess.Popen] = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.sessions = 0
+        self.healthy = False
+        self.failures = 0
+        self.draining_since: Optional[float] = None
+        self.rss_bytes: Optional[int] = None
+        self.recycle_reason = ""
+
+    def start(self):
+        command = [
+            sys.executable, "-m", "streamlit", "run", APP_PATH,
+            *self.streamlit_args,
+            f"--server.port={self.port}",
+            "--server.address=127.0.0.1",
+            "--server.headless=true",
+        ]
+        self.process = subprocess.Popen(command)
+        self.started_at = time.time()
+        self.healthy = False
+        self.failures = 0
+        self.draining_since = None
+        print(f"Worker {self.index} started on port {self.port} (pid {self.process.pid})")
+
+    def stop(self, timeout: float = 10):
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+    def restart(self, reason: str):
+        print(f"Restarting worker {self.index}: {reason}")
+        self.stop()
+        self.restarts += 1
+        self.recycle_reason = reason
+        self.sessions = 0
+        self.start()
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    @property
+    def available(self) -> bool:
+        return self.alive and self.healthy and self.draining_since is None
+
+    def status(self):
+        return {
+            "index": self.index,
+            "port": self.port,
+            "pid": self.process.pid if self.process else None,
+            "alive": self.alive,
+            "healthy": self.healthy,
+            "draining": self.draining_since is not None,
+            "sessions": self.sessions,
+            "rss_bytes": self.rss_bytes,
+            "restarts": self.restarts,
+            "uptime_seconds": time.time() - self.started_at if self.alive else 0,
+            "last_recycle_reason": self.recycle_reason,
+        }
+
+
+class Supervisor:
+    """Owns the workers, their health checks and the routing decisions"""
+
+    def __init__(self, workers: int, base_port: int, streamlit_args: List[str], base_path: str):
+        self.base_path = base_path.rstrip("/")
+        self.workers = [Worker(i, base_port + i, streamlit_args) for i in range(workers)]
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+
+    def stop(self):
+        for worker in self.workers:
+            worker.stop()
+
+    def pick(self, cookie: Optional[str]) -> Optional[Worker]:
+        """Worker of the browser's cookie, else the least loaded available one"""
+        if cookie is not None and cookie.isdigit() and int(cookie) < len(self.workers):
+            worker = self.workers[int(cookie)]
+            # Draining workers keep serving the sessions they already have
+            if worker.alive and worker.healthy:
+                return worker
+        available = [w for w in self.workers if w.available]
+        if not available:
+            available = [w for w in self.workers if w.alive]
+        if not available:
+            return None
+        return min(available, key=lambda w: (w.sessions, w.index))
+
+    def worker_url(self, worker: Worker, path: str) -> str:
+        return f"http://127.0.0.1:{worker.port}{path}"
+
+    async def check(self):
+        """Health-check every worker and recycle the ones that need it"""
+        from tornado.httpclient import AsyncHTTPClient
+
+        client = AsyncHTTPClient()
+        loop = asyncio.get_event_loop()
+        for worker in self.workers:
+            # Restarts wait for the old process, so keep them off the IO loop
+            if not worker.alive:
+                await loop.run_in_executor(None, worker.restart, "process exited")
+                continue
+
+            try:
+                response = await client.fetch(
+                    self.worker_url(worker, f"{self.base_path}/_stcore/health"),
+                    request_timeout=5, raise_error=False,
+                )
+                ok = response.code == 200
+            except Exception:
+                ok = False
+            if ok:
+                worker.healthy = True
+                worker.failures = 0
+            elif worker.healthy or time.time() - worker.started_at > 60:
+                worker.failures += 1
+                if worker.failures >= HEALTH_FAILURES:
+                    await loop.run_in_executor(None, worker.restart, "health check failed")
+                    continue
+
+            worker.rss_bytes = read_rss_bytes(worker.process.pid)
+            over_limit = MAX_RSS_MB and worker.rss_bytes and worker.rss_bytes > MAX_RSS_MB * 1024 * 1024
+            if over_limit and worker.draining_since is None:
+                print(f"Worker {worker.index} over memory ceiling "
+                      f"({worker.rss_bytes // (1024 * 1024)} MB), draining")
+                worker.draining_since = time.time()
+            if worker.draining_since is not None:
+                drained = worker.sessions == 0 or time.time() - worker.draining_since > DRAIN_TIMEOUT
+                if drained:
+                    await loop.run_in_executor(None, worker.restart, "memory ceiling exceeded")
+
+    async def metrics(self) -> str:
+        """OpenMetrics text: supervisor gauges plus every worker's own metrics"""
+        from tornado.httpclient import AsyncHTTPClient
+
+        lines = []
+        for name, field in (("report_worker_sessions", "sessions"),
+                            ("report_worker_rss_bytes", "rss_bytes"),
+                            ("report_worker_restarts_total", "restarts")):
+            lines.append(f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}")
+            for worker in self.workers:
+                value = getattr(worker, field)
+                if value is not None:
+                    lines.append(f'{name}{{worker="{worker.index}"}} {value}')
+
+        client = AsyncHTTPClient()
+        for worker in self.workers:
+            if not worker.alive:
+                continue
+            try:
+                response = await client.fetch(
+                    self.worker_url(worker, f"{self.base_path}/_stcore/metrics"),
+                    headers={"Accept": "application/openmetrics-text"},
+                    request_timeout=5, raise_error=False,
+                )
+            except Exception:
+                continue
+            if response.code != 200:
+                continue
+            for line in response.body.decode("utf-8", "replace").splitlines():
+                if not line or line.startswith("#"):
+                    continue
+                # Label every worker sample so they can be summed or compared
+                name, _, rest = line.partition(" ")
+                if "{" in name:
+                    name = name.replace("{", f'{{worker="{worker.index}",', 1)
+                else:
+                    name = f'{name}{{worker="{worker.index}"}}'
+                lines.append(f"{name} {rest}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def make_app(supervisor: Supervisor):
+    """Tornado application proxying every request to a worker"""
+    import tornado.web
+    import tornado.websocket
+    from tornado.httpclient import AsyncHTTPClient, HTTPRequest
+
+    class MetricsHandler(tornado.web.RequestHandler):
+        async def get(self):
+            self.set_header("Content-Type", "application/openmetrics-text; version=1.0.0")
+            self.write(await supervisor.metrics())
+
+    class StatusHandler(tornado.web.RequestHandler):
+        def get(self):
+            self.set_header("Content-Type", "application/json")
+            self.write(json.dumps({"workers": [w.status() for w in supervisor.workers]}))
+
+    class StreamProxyHandler(tornado.websocket.WebSocketHandler):
+        """Streamlit session websocket, pinned to one worker"""
+
+        upstream = None
+        worker = None
+
+        def check_origin(self, origin):
+            # Workers apply Streamlit's own CORS/XSRF settings
+            return True
+
+        def select_subprotocol(self, subprotocols):
+            return subprotocols[0] if subprotocols else None
+
+        async def open(self, *args):
+            self.worker = supervisor.pick(self.get_cookie(WORKER_COOKIE))
+            if self.worker is None:
+                self.close(1013, "No worker available")
+                return
+            self.worker.sessions += 1
+
+            headers = {k: v for k, v in self.request.headers.get_all()
+                       if k.lower() not in HOP_BY_HOP_HEADERS and not k.lower().startswith("sec-websocket")}
+            subprotocols = [p.strip() for p in
+                            self.request.headers.get("Sec-WebSocket-Protocol", "").split(",") if p.strip()]
+            url = "ws" + supervisor.worker_url(self.worker, self.request.uri)[len("http"):]
+            try:
+                self.upstream = await tornado.websocket.websocket_connect(
+                    HTTPRequest(url, headers=headers), subprotocols=subprotocols or None,
+                )
+            except Exception as e:
+                print(f"Websocket proxy to worker {self.worker.index} failed: {e}")
+                self.close(1011, "Worker unavailable")
+                return
+            asyncio.ensure_future(self._pump_upstream())
+
+        async def _pump_upstream(self):
+            while True:
+                message = await self.upstream.read_message()
+                if message is None:
+                    self.close()
+                    return
+                try:
+                    await self.write_message(message, binary=isinstance(message, bytes))
+                except tornado.websocket.WebSocketClosedError:
+                    return
+
+        async def on_message(self, message):
+            if self.upstream is not None:
+                await self.upstream.write_message(message, binary=isinstance(message, bytes))
+
+        def on_close(self):
+            if self.worker is not None:
+                self.worker.sessions = max(self.worker.sessions - 1, 0)
+                self.worker = None
+            if self.upstream is not None:
+                self.upstream.close()
+                self.upstream = None
+
+    class HttpProxyHandler(tornado.web.RequestHandler):
+        SUPPORTED_METHODS = ("GET", "HEAD", "POST", "PUT", "DELETE", "OPTIONS", "PATCH")
+
+        async def _proxy(self, *args):
+            worker = supervisor.pick(self.get_cookie(WORKER_COOKIE))
+            if worker is None:
+                self.set_status(503)
+                self.finish("No worker available")
+                return
+
+            headers = {k: v for k, v in self.request.headers.get_all() if k.lower() not in HOP_BY_HOP_HEADERS}
+            body = self.request.body if self.request.method in ("POST", "PUT", "PATCH") else None
+            response = await AsyncHTTPClient().fetch(
+                HTTPRequest(
+                    supervisor.worker_url(worker, self.request.uri),
+                    method=self.request.method, headers=headers, body=body,
+                    follow_redirects=False, decompress_response=False,
+                    allow_nonstandard_methods=True, request_timeout=300,
+                ),
+                raise_error=False,
+            )
+            if response.code == 599:
+                self.set_status(502)
+                self.finish("Worker unavailable")
+                return
+
+            # Drop Tornado's default headers; the worker's response is authoritative
+            self.clear()
+            self.set_status(response.code, response.reason)
+            for name, value in response.headers.get_all():
+                if name.lower() not in HOP_BY_HOP_HEADERS:
+                    self.add_header(name, value)
+            if self.get_cookie(WORKER_COOKIE) != str(worker.index):
+                self.set_cookie(WORKER_COOKIE, str(worker.index), path="/", httponly=True)
+            if response.body and self.request.method != "HEAD":
+                self.write(response.body)
+            self.finish()
+
+        get = head = post = put = delete = options = patch = _proxy
+
+    return tornado.web.Application([
+        (r"/_supervisor/metrics", MetricsHandler),
+        (r"/_supervisor/status", StatusHandler),
+        (r"(.*/_stcore/stream)", StreamProxyHandler),
+        (r"(.*)", HttpProxyHandler),
+    ])
+
+
+def _base_path(streamlit_args: List[str]) -> str:
+    for arg in streamlit_args:
+        if arg.startswith("--server.baseUrlPath="):
+            path = arg.split("=", 1)[1].strip("/")
+            return f"/{path}" if path else ""
+    return ""
+
+
+def _max_upload_bytes(streamlit_args: List[str]) -> int:
+    """``server.maxUploadSize`` of the workers, so the proxy accepts the same uploads"""
+    megabytes = None
+    for arg in streamlit_args:
+        if arg.startswith("--server.maxUploadSize="):
+            megabytes = int(arg.split("=", 1)[1])
+    if megabytes is None:
+        try:
+            from streamlit import config
+            megabytes = config.get_option("server.maxUploadSize")
+        except Exception:
+            megabytes = 200
+    return megabytes * 1024 * 1024
+
+
+def run_single(streamlit_args: List[str]):
+    """One worker: replace this process with Streamlit itself"""
+    command = [sys.executable, "-m", "streamlit", "run", APP_PATH, *streamlit_args,
+               f"--server.port={PORT}", "--server.address=0.0.0.0"]
+    os.execv(sys.executable, command)
+
+
+def run_supervised(workers: int, streamlit_args: List[str]):
+    import tornado.ioloop
+    from tornado.httpclient import AsyncHTTPClient
+
+    supervisor = Supervisor(workers, BASE_WORKER_PORT, streamlit_args, _base_path(streamlit_args))
+    supervisor.start()
+
+    # Tornado's 100 MB default would reject uploads Streamlit accepts
+    max_body = _max_upload_bytes(streamlit_args)
+    AsyncHTTPClient.configure(None, max_body_size=max_body, max_buffer_size=max_body)
+
+    app = make_app(supervisor)
+    app.listen(PORT, address="0.0.0.0", max_body_size=max_body, max_buffer_size=max_body)
+    loop = tornado.ioloop.IOLoop.current()
+
+    def shutdown(signum, frame):
+        print(f"Received signal {signum}, stopping workers")
+        supervisor.stop()
+        loop.add_callback_from_signal(loop.stop)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    tornado.ioloop.PeriodicCallback(supervisor.check, HEALTH_INTERVAL * 1000).start()
+    print(f"Supervisor listening on port {PORT} with {workers} workers")
+    loop.start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the report app with several Streamlit workers')
+    parser.add_argument('--workers', '-w', type=int, default=WORKERS,
+                        help='Number of Streamlit workers (env REPORT_WORKERS)')
+    parser.add_argument('streamlit_args', nargs=argparse.REMAINDER,
+                        help='Arguments passed to every "streamlit run" (after --)')
+
+    args = parser.parse_args()
+    streamlit_args = [a for a in args.streamlit_args if a != "--"]
+
+    if args.workers <= 1:
+        run_single(streamlit_args)
+    else:
+        run_supervised(args.workers, streamlit_args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import db_pool
+
+
+def test_normalize_sql_collapses_whitespace_and_comments():
+    sql = """
+        SELECT uf,   count(*)  -- por estado
+        FROM alunos
+        WHERE ano = :ano ;
+    """
+    assert db_pool.normalize_sql(sql) == "SELECT uf, count(*) FROM alunos WHERE ano = :ano"
+
+
+def test_normalize_sql_keeps_string_literals():
+    sql = "SELECT * FROM t WHERE nome = 'a  --  b' AND x = 'it''s   here'"
+    assert db_pool.normalize_sql(sql) == sql
+
+
+def test_cache_key_ignores_formatting_only():
+    key = db_pool.cache_key("dw", "SELECT 1  -- x", {"a": 1}, "postgresql://h/db")
+    assert key == db_pool.cache_key("dw", "SELECT 1;", {"a": 1}, "postgresql://h/db")
+    assert key != db_pool.cache_key("dw", "SELECT 1", {"a": 2}, "postgresql://h/db")
+    assert key != db_pool.cache_key("dw", "SELECT 1", {"a": 1}, "postgresql://other/db")
+    assert key != db_pool.cache_key("other", "SELECT 1", {"a": 1}, "postgresql://h/db")
@@ -0,0 +1,45 @@
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("toml")
+
+import precompute  # noqa: E402
+
+
+def _utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("expression, moment, expected", [
+    ("*/15 * * * *", _utc(2024, 1, 1, 10, 7), _utc(2024, 1, 1, 10, 15)),
+    ("0 */6 * * *", _utc(2024, 1, 1, 6, 0), _utc(2024, 1, 1, 12, 0)),
+    ("@daily", _utc(2024, 1, 31, 23, 59), _utc(2024, 2, 1, 0, 0)),
+    ("30 2 * * 1-5", _utc(2024, 1, 5, 3, 0), _utc(2024, 1, 8, 2, 30)),  # Friday -> Monday
+    ("0 0 29 2 *", _utc(2024, 3, 1, 0, 0), _utc(2028, 2, 29, 0, 0)),
+    ("0 0 1 * 0", _utc(2024, 1, 2, 0, 0), _utc(2024, 1, 7, 0, 0)),  # day or weekday
+    ("0 12 * * 7", _utc(2024, 1, 1, 0, 0), _utc(2024, 1, 7, 12, 0)),  # 7 is Sunday
+])
+def test_next_after(expression, moment, expected):
+    assert precompute.CronSchedule(expression).next_after(moment) == expected
+
+
+def test_is_due():
+    schedule = precompute.CronSchedule("@hourly")
+    last = _utc(2024, 1, 1, 10, 0).timestamp()
+    assert schedule.is_due(None)
+    assert not schedule.is_due(last, now=_utc(2024, 1, 1, 10, 59).timestamp())
+    assert schedule.is_due(last, now=_utc(2024, 1, 1, 11, 0).timestamp())
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "61 * * * *", "0 0 31 2 *"])
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        precompute.CronSchedule(expression).next_after(_utc(2024, 1, 1))
+
+
+def test_params_key_is_stable_and_safe():
+    key = precompute.params_key({"uf": "DF/GO", "ano": 2024})
+    assert key == precompute.params_key({"ano": 2024, "uf": "DF/GO"})
+    assert "/" not in key
+    assert precompute.params_key({}) == "default"
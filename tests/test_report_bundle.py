@@ -0,0 +1,77 @@
+import sys
+import threading
+
+import pytest
+
+import report_bundle
+
+
+def _bundle(tmp_path, report_id, files):
+    src = tmp_path / str(report_id)
+    for path, content in files.items():
+        target = src / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(content)
+    return report_bundle.load_bundle(report_bundle.build_bundle(str(src), report_id, "v1"))
+
+
+def _run(bundle):
+    namespace = bundle.bind({"__name__": "__main__"})
+    exec(bundle.code(), namespace)
+    return namespace
+
+
+def test_helper_modules_and_packages(tmp_path):
+    bundle = _bundle(tmp_path, 1, {
+        "main.py": "import helpers\nfrom pkg import sub\nfrom pkg.sub import VALUE\nresult = (helpers.X, sub.VALUE, VALUE)\n",
+        "helpers.py": "X = 1\n",
+        "pkg/__init__.py": "",
+        "pkg/sub.py": "from . import base\nVALUE = base.BASE + 1\n",
+        "pkg/base.py": "BASE = 41\n",
+    })
+    assert _run(bundle)["result"] == (1, 42, 42)
+
+
+def test_imports_stay_out_of_sys_modules(tmp_path):
+    bundle = _bundle(tmp_path, 2, {"main.py": "import helpers\nimport json\n", "helpers.py": "X = 1\n"})
+    namespace = _run(bundle)
+    assert "helpers" not in sys.modules
+    assert namespace["json"] is sys.modules["json"]
+
+
+def test_bundles_are_isolated_across_threads(tmp_path):
+    bundles = {name: _bundle(tmp_path, name, {"main.py": "import helpers\nresult = helpers.NAME\n",
+                                              "helpers.py": f"NAME = {name!r}\n"})
+               for name in ("a", "b")}
+    results = {}
+
+    def run(name):
+        for _ in range(50):
+            results.setdefault(name, set()).add(_run(bundles[name])["result"])
+
+    threads = [threading.Thread(target=run, args=(name,)) for name in bundles]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {"a": {"a"}, "b": {"b"}}
+
+
+def test_missing_module(tmp_path):
+    bundle = _bundle(tmp_path, 3, {"main.py": "x = 1\n", "helpers.py": ""})
+    with pytest.raises(ModuleNotFoundError):
+        bundle.import_module("absent")
+
+
+def test_failed_module_is_not_kept(tmp_path):
+    bundle = _bundle(tmp_path, 4, {"main.py": "", "broken.py": "raise RuntimeError('boom')\n"})
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            bundle.import_module("broken")
+
+
+def test_missing_entrypoint(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "helpers.py").write_text("")
+    with pytest.raises(report_bundle.BundleError):
+        report_bundle.build_bundle(str(tmp_path / "src"), 5)
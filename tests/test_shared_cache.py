@@ -0,0 +1,134 @@
+"""Contract of the shared cache backends: memory, disk and a local Redis when available"""
+
+import os
+import threading
+import time
+import uuid
+
+import pytest
+
+import shared_cache
+
+REDIS_URL = os.environ.get("REPORT_TEST_REDIS_URL", "redis://localhost:6379/15")
+
+
+def _redis_backend():
+    redis = pytest.importorskip("redis")
+    try:
+        redis.Redis.from_url(REDIS_URL, socket_connect_timeout=0.5).ping()
+    except Exception as e:
+        pytest.skip(f"Redis not available at {REDIS_URL}: {e}")
+    return shared_cache.RedisBackend(REDIS_URL)
+
+
+@pytest.fixture(params=["memory", "disk", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return shared_cache.MemoryBackend()
+    if request.param == "disk":
+        disk = shared_cache.DiskBackend(str(tmp_path))
+        disk.POLL_SECONDS = 0.05
+        return disk
+    return _redis_backend()
+
+
+@pytest.fixture
+def key():
+    # Unique per test, so a shared Redis needs no cleanup between runs
+    return f"test:{uuid.uuid4().hex}"
+
+
+def test_get_missing(backend, key):
+    assert backend.get(key) is None
+
+
+def test_set_get_delete(backend, key):
+    backend.set(key, b"value\nwith newline")
+    assert backend.get(key) == b"value\nwith newline"
+    backend.set(key, b"replaced")
+    assert backend.get(key) == b"replaced"
+    backend.delete(key)
+    assert backend.get(key) is None
+    backend.delete(key)
+
+
+def test_ttl_expires(backend, key):
+    backend.set(key, b"short", ttl=1)
+    assert backend.get(key) == b"short"
+    time.sleep(1.2)
+    assert backend.get(key) is None
+
+
+def test_set_if_absent(backend, key):
+    assert backend.set_if_absent(key, b"first", ttl=30)
+    assert not backend.set_if_absent(key, b"second", ttl=30)
+    assert backend.get(key) == b"first"
+    backend.delete(key)
+    assert backend.set_if_absent(key, b"third", ttl=30)
+    assert backend.get(key) == b"third"
+    backend.delete(key)
+
+
+def test_set_if_absent_after_expiry(backend, key):
+    assert backend.set_if_absent(key, b"lease", ttl=1)
+    time.sleep(1.2)
+    assert backend.set_if_absent(key, b"renewed", ttl=30)
+    assert backend.get(key) == b"renewed"
+    backend.delete(key)
+
+
+def test_set_if_absent_single_winner(backend, key):
+    results = []
+    barrier = threading.Barrier(8)
+
+    def claim():
+        barrier.wait()
+        results.append(backend.set_if_absent(key, b"lease", ttl=30))
+
+    threads = [threading.Thread(target=claim) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 1
+    backend.delete(key)
+
+
+def test_publish_subscribe(backend, key):
+    received = []
+    delivered = threading.Event()
+
+    def callback(message):
+        if message.get("source") == key:
+            received.append(message)
+            delivered.set()
+
+    backend.subscribe(callback)
+    # Subscribers listening from a thread need a moment to attach
+    time.sleep(0.3)
+    backend.publish({"keys": ["a", "b"], "reason": "test", "source": key})
+    assert delivered.wait(5)
+    assert received[0]["keys"] == ["a", "b"]
+
+
+def test_shared_cache_invalidation_reaches_other_instances(backend, key):
+    first = shared_cache.SharedCache(backend)
+    second = shared_cache.SharedCache(backend)
+    time.sleep(0.3)
+    first.set_local(key, "parsed")
+    second.set_local(key, "parsed")
+    first.set_bytes(key, b"raw")
+
+    second.invalidate([key], "test")
+    deadline = time.time() + 5
+    while first.get_local(key) is not None and time.time() < deadline:
+        time.sleep(0.05)
+    assert first.get_local(key) is None
+    assert first.get_bytes(key) is None
+
+
+def test_backend_from_url(tmp_path):
+    assert isinstance(shared_cache.backend_from_url("memory://"), shared_cache.MemoryBackend)
+    assert isinstance(shared_cache.backend_from_url(f"file://{tmp_path}"), shared_cache.DiskBackend)
+    with pytest.raises(ValueError):
+        shared_cache.backend_from_url("ftp://example")
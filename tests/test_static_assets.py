@@ -0,0 +1,21 @@
+import static_assets
+
+
+def test_minify_css_strips_comments_and_whitespace():
+    css = """
+    /* header */
+    .nav  a ,  .nav   b {
+        color : red ;
+        margin: 0 auto;
+    }
+    """
+    assert static_assets.minify_css(css) == ".nav a,.nav b{color:red;margin:0 auto}"
+
+
+def test_minify_css_leaves_strings_intact():
+    css = '.a::before { content: "/* not a comment */  x ; y"; } /* gone */ .b { font-family: \'A  B\'; }'
+    assert static_assets.minify_css(css) == '.a::before{content:"/* not a comment */  x ; y"}.b{font-family:\'A  B\'}'
+
+
+def test_minify_css_comment_containing_quote():
+    assert static_assets.minify_css("/* it's */ .a { color: blue; }") == ".a{color:blue}"
@@ -0,0 +1,45 @@
+import random
+from collections import Counter
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("numpy")
+
+import stream_reader  # noqa: E402
+
+
+def _feed(aggregator, values, chunk_size):
+    for start in range(0, len(values), chunk_size):
+        aggregator.update(pd.DataFrame({"v": values[start:start + chunk_size]}))
+    return aggregator.result()
+
+
+def test_topk_exact_below_capacity():
+    values = ["a"] * 50 + ["b"] * 30 + ["c"] * 20 + ["d"] * 5
+    random.Random(1).shuffle(values)
+    result = _feed(stream_reader.TopK("v", k=3), values, chunk_size=7)
+    assert result.to_dict() == {"a": 50, "b": 30, "c": 20}
+
+
+def test_topk_space_saving_guarantees():
+    rng = random.Random(2)
+    heavy = [f"h{i}" for i in range(5)]
+    values = [rng.choice(heavy) for _ in range(5000)] + [f"n{i}" for i in range(3000)]
+    rng.shuffle(values)
+    capacity = 50
+    aggregator = stream_reader.TopK("v", k=5, capacity=capacity)
+    result = _feed(aggregator, values, chunk_size=100)
+
+    exact = Counter(values)
+    assert set(result.index) == set(heavy)
+    assert len(aggregator.counts) <= capacity
+    # Space-Saving never under-counts, and over-counts by at most n / capacity
+    for value, count in result.items():
+        assert exact[value] <= count <= exact[value] + len(values) / capacity
+
+
+def test_histogram_counts_out_of_range():
+    result = _feed(stream_reader.Histogram("v", range=(0, 10), bins=2), [-1, 0, 4, 5, 9, 10, 11, None], 3)
+    assert result["contagem"].tolist() == [1, 2, 3, 1]
+    assert result.index[0] == "< 0" and result.index[-1] == "> 10"